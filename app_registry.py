@@ -0,0 +1,88 @@
+# app_registry.py ───────────────────────────────────────────
+"""子应用注册表
+
+每个子应用声明显示名称、权限键和入口（模块 + 函数），模块只在有权限的用户
+选中该应用时才导入。新增子应用只需在 SUB_APPS 中追加一项。
+
+命令行运行 `python app_registry.py` 会在独立进程中冷启动导入每个子应用，
+超出 IMPORT_BUDGET_S 时以非零状态退出，用于守住登录后首屏的延迟。
+"""
+import importlib
+import logging
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# 单个子应用冷启动导入的时间预算（秒）
+IMPORT_BUDGET_S = 1.5
+
+
+@dataclass(frozen=True)
+class SubApp:
+    name: str           # 侧边栏中显示的名称
+    permission: str     # credentials.toml 中的权限键
+    module: str         # 模块名
+    entry: str = "run"  # 入口函数
+
+
+SUB_APPS: List[SubApp] = [
+    SubApp('以色列王国时期诸王',   'kings_story',      'kings_story'),
+    SubApp('以色列先知时期诸先知', 'prophets_story',   'prophets_story'),
+    SubApp('以色列各历史时期领袖', 'characters_story', 'characters_story'),
+    SubApp('历史路线地图合集',     'routes_map',       'routes_map'),
+    SubApp('地理区块标注',         'areas_map',        'areas_map'),
+    SubApp('全文检索',             'search',           'search_page'),
+    SubApp('经文索引',             'scripture',        'scripture_page'),
+]
+
+_lock = threading.Lock()
+import_times: Dict[str, float] = {}     # 模块名 -> 首次导入耗时（秒）
+
+
+def available(permissions: List[str]) -> List[SubApp]:
+    """用户有权限访问的子应用，保持注册顺序"""
+    return [app for app in SUB_APPS if app.permission in permissions]
+
+
+def load_entry(app: SubApp) -> Callable[[], None]:
+    """按需导入子应用模块并返回入口函数"""
+    with _lock:
+        if app.module not in sys.modules:
+            start = time.perf_counter()
+            importlib.import_module(app.module)
+            elapsed = time.perf_counter() - start
+            import_times[app.module] = elapsed
+            if elapsed > IMPORT_BUDGET_S:
+                logger.warning("导入 %s 耗时 %.2fs，超出预算 %.2fs", app.module, elapsed, IMPORT_BUDGET_S)
+    return getattr(sys.modules[app.module], app.entry)
+
+
+def measure_cold_import(module: str) -> float:
+    """在新的解释器进程中测量模块的冷启动导入耗时（秒）"""
+    code = ("import time; t = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def check_import_budget(budget: float = IMPORT_BUDGET_S) -> Dict[str, float]:
+    """返回超出预算的子应用及其冷启动导入耗时"""
+    over = {}
+    for app in SUB_APPS:
+        elapsed = measure_cold_import(app.module)
+        print(f"{app.module:<20} {elapsed:6.3f}s")
+        if elapsed > budget:
+            over[app.module] = elapsed
+    return over
+
+
+if __name__ == "__main__":
+    over_budget = check_import_budget()
+    if over_budget:
+        print(f"超出导入预算 {IMPORT_BUDGET_S}s：{', '.join(over_budget)}")
+        sys.exit(1)
@@ -2,83 +2,81 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import requests, json, pathlib, numpy as np
+import pathlib
 from itertools import cycle
-from typing import Dict, Any, List
-
-st.title("地图区域合集")
-
-def run():
-     
-    # ───── 路径 / 文件 ─────────────────────────────────────────
-    DB = pathlib.Path("database"); DB.mkdir(exist_ok=True)
-    XLSX  = DB / "areas_file.xlsx"      # 主数据表
-    CITYC = DB / "city_cache.json"      # 城市坐标缓存
-
-    # 颜色池
-    COLOR_POOL = px.colors.qualitative.Plotly + px.colors.qualitative.D3
-
-    # ───── 数据加载 ──────────────────────────────────────────
-    @st.cache_data
-    def load_table(path: pathlib.Path) -> pd.DataFrame:
-        if not path.exists():
-            st.error(f"缺少数据表：{path}")
-            st.stop()
-        return pd.read_excel(path, dtype=str)
-
-    def load_geo(path: pathlib.Path) -> Dict[str, Any]:
-        if not path.exists():
-            st.error(f"GeoJSON 文件不存在：{path}")
-            st.stop()
-        return json.loads(path.read_text())
-
-    df = load_table(XLSX)
-
-    # ───── UI：区域组 & Token ────────────────────────────────
-    groups = sorted(df["地理区域组"].unique())
-    sel_group = st.selectbox("选择『地理区域组』", groups)
-
-    token = st.text_input("Mapbox Access Token", type="password")
-    if not token:
-        st.info("请输入有效 Mapbox Token")
-        st.stop()
-
-    # ───── 当前区域组 & GeoJSON ──────────────────────────────
-    view = df[df["地理区域组"] == sel_group].copy()
-    geo_files = view["geo文件"].unique().tolist()
-    if len(geo_files) != 1:
-        st.error("同一『地理区域组』应指向唯一 geo文件，请检查 Excel")
-        st.stop()
-
-    geo = load_geo(DB / geo_files[0])
+import data_store
+import geocoding
+import geo_index
+import geo_simplify
+import figure_cache
+import paged_table
+import instrument
+import basemap
+import gazetteer
+import spatial_index
+
+CITY_CACHE = data_store.DB / "city_cache.json"      # 城市坐标缓存
+DEFAULT_ZOOM = 3
+
+# 颜色池
+COLOR_POOL = px.colors.qualitative.Plotly + px.colors.qualitative.D3
+
+def group_views(frame: pd.DataFrame) -> dict:
+    """地理区域组 -> 该组的数据视图、州 / 城市拆分及“分组”着色
+
+    按数据版本只计算一次（data_store.derived），所有会话共享，调用方不得原地修改。
+    """
+    views = {}
+    for group, view in frame.groupby("地理区域组", sort=True):
+        view = view.reset_index(drop=True)
+        grp_vals = sorted(view["分组"].unique())
+        color_cycle = cycle(COLOR_POOL)
+        color_map = {g: next(color_cycle) for g in grp_vals}
+        states = view[view["地理类型"] == "州"]
+        views[group] = {
+            "view": view,
+            "grp_vals": grp_vals,
+            "color_map": color_map,
+            # 着色列：颜色 / dummy 与视图一起预先算好
+            "states": states.assign(颜色=states["分组"].map(color_map), dummy=states["分组"]),
+            "cities": view[view["地理类型"] == "城市"],
+        }
+    return views
 
-    # ───── 颜色映射（按“分组”） ─────────────────────────────
-    grp_vals = sorted(view["分组"].unique())
-    color_cycle = cycle(COLOR_POOL)
-    color_map = {g: next(color_cycle) for g in grp_vals}
+def locate_cities(cities: pd.DataFrame, token=None):
+    """城市坐标（本地地名库 → 缓存 → 并发 Geocoding）
 
-    # ───── 拆分州 / 城市 ────────────────────────────────────
-    states = view[view["地理类型"] == "州"].copy()
-    cities = view[view["地理类型"] == "城市"].copy()
+    返回 ({lat, lon, text, hover}, 失败说明列表)；无令牌时不发网络请求。
+    """
+    geocoder = geocoding.get_geocoder(CITY_CACHE, token, gazetteer=gazetteer.get())
+    coords, errors = geocoder.resolve(dict(zip(cities["代码"], cities["名称(英文)"])))
+    points = {"lat": [], "lon": [], "text": [], "hover": []}
+    failures = []
 
-    states["颜色"] = states["分组"].map(color_map)
-    states["dummy"] = states["分组"]        # 着色列
+    for _, row in cities.iterrows():
+        code, en = row["代码"], row["名称(英文)"]
+        if code in errors:
+            failures.append(f"Geocoding '{en}' 失败：{errors[code]}")
+            continue
+        coord = coords.get(code)
+        if coord is None:
+            failures.append(f"Geocoding '{en}' 失败：无匹配结果")
+            continue
+        points["lat"].append(coord["lat"]); points["lon"].append(coord["lon"])
+        points["text"].append(row["名称(中文)"])
+        points["hover"].append(
+            f"<b>{row['名称(中文)']}</b><br>"
+            f"{row['名称(英文)']}<br>分组：{row['分组']}<br>{row['描述']}"
+        )
+    return points, failures
 
-    # ───── 州多边形质心（用于中文标签） ───────────────────────
-    def poly_centroid(coords: List[List[float]]) -> (float, float):
-        lon, lat = zip(*coords)
-        return np.mean(lat), np.mean(lon)
+def build_figure(states, color_map, geo_path, zoom, points):
+    """区域组地图：按“分组”着色的州、城市散点与州中文标签（不含底图与令牌，便于缓存）"""
+    # 只含当前视图要素、按缩放级别简化的 GeoJSON
+    geo = geo_simplify.view_geo(geo_path, states["代码"], zoom)
 
-    state_centers = {}
-    for feat in geo["features"]:
-        sid = feat.get("id")
-        geom = feat["geometry"]
-        if geom["type"] == "Polygon":
-            lat, lon = poly_centroid(geom["coordinates"][0])
-        else:  # MultiPolygon -> 取点最多的环
-            biggest = max(geom["coordinates"], key=lambda poly: len(poly[0]))
-            lat, lon = poly_centroid(biggest[0])
-        state_centers[sid] = {"lat": lat, "lon": lon}
+    # ───── 州标签锚点（预计算的面积加权质心） ─────────────────
+    state_centers = geo_index.anchors(geo_path)
 
     # ───── 州图层 ────────────────────────────────────────────
     fig = px.choropleth_mapbox(
@@ -90,7 +88,7 @@ def run():
         color_discrete_map=color_map,
         opacity=0.35,
         mapbox_style="carto-positron",
-        zoom=3, center=dict(lat=37.8, lon=-96),
+        zoom=zoom, center=dict(lat=37.8, lon=-96),
         hover_data={
             "名称(中文)": True,
             "名称(英文)": True,
@@ -100,42 +98,14 @@ def run():
         }
     )
 
-    # ───── 城市坐标（缓存 + Geocoding） ──────────────────────
-    cache = json.loads(CITYC.read_text()) if CITYC.exists() else {}
-    lat, lon, text, hover = [], [], [], []
-
-    for _, row in cities.iterrows():
-        code, en = row["代码"], row["名称(英文)"]
-        if code in cache:
-            coord = cache[code]
-        else:
-            url = (f"https://api.mapbox.com/geocoding/v5/mapbox.places/"
-                   f"{en.replace(' ', '%20')}.json?limit=1&access_token={token}")
-            try:
-                res = requests.get(url, timeout=10).json()
-                lon_, lat_ = res["features"][0]["center"]
-                coord = {"lat": lat_, "lon": lon_}
-                cache[code] = coord
-            except Exception as e:
-                st.warning(f"Geocoding '{en}' 失败：{e}")
-                continue
-        lat.append(coord["lat"]); lon.append(coord["lon"])
-        text.append(row["名称(中文)"])
-        hover.append(
-            f"<b>{row['名称(中文)']}</b><br>"
-            f"{row['名称(英文)']}<br>分组：{row['分组']}<br>{row['描述']}"
-        )
-
-    CITYC.write_text(json.dumps(cache, ensure_ascii=False, indent=2))
-
     # ───── 城市散点（固定红色，不入图例） ──────────────────
     fig.add_scattermapbox(
-        lat=lat, lon=lon,
-        text=text,
+        lat=points["lat"], lon=points["lon"],
+        text=points["text"],
         mode="markers+text",
         marker=dict(size=10, color="red"),
         textfont=dict(color="red"),
-        hovertext=hover, hoverinfo="text",
+        hovertext=points["hover"], hoverinfo="text",
         textposition="top right",
         showlegend=False
     )
@@ -145,8 +115,8 @@ def run():
     for _, row in states.iterrows():
         center = state_centers.get(row["代码"])
         if center:
-            state_lat.append(center["lat"])
-            state_lon.append(center["lon"])
+            state_lat.append(center["label_lat"])
+            state_lon.append(center["label_lon"])
             state_txt.append(row["名称(中文)"])
 
     fig.add_scattermapbox(
@@ -156,9 +126,103 @@ def run():
         textfont=dict(size=14, color="black"),
         showlegend=False
     )
+    return fig
+
+def run():
+    st.title("地图区域合集")
+
+    # ───── 路径 / 文件 ─────────────────────────────────────────
+    DB = data_store.DB; DB.mkdir(exist_ok=True)
+    XLSX  = data_store.path("areas")    # 主数据表
 
-    fig.update_layout(mapbox_accesstoken=token, margin=dict(l=0,r=0,t=0,b=0))
-    st.plotly_chart(fig, use_container_width=True)
+    # ───── 数据加载 ──────────────────────────────────────────
+    def check_table(path: pathlib.Path) -> dict:
+        """主数据表存在时返回按区域组预先拆分的共享视图"""
+        if not path.exists():
+            st.error(f"缺少数据表：{path}")
+            st.stop()
+        return data_store.derived("areas", group_views)
+
+    def check_geo(path: pathlib.Path) -> pathlib.Path:
+        if not path.exists():
+            st.error(f"GeoJSON 文件不存在：{path}")
+            st.stop()
+        return path
+
+    views = check_table(XLSX)
+
+    # ───── UI：区域组 & Token ────────────────────────────────
+    groups = list(views)
+    sel_group = st.selectbox("选择『地理区域组』", groups)
+    zoom = st.slider("地图缩放级别", min_value=1, max_value=10, value=DEFAULT_ZOOM)
+
+    map_mode = st.radio("地图底图", basemap.MODES, horizontal=True)
+    token = None
+    if map_mode == basemap.MAPBOX:
+        token = st.text_input("Mapbox Access Token", type="password")
+        if not token:
+            st.info("请输入有效 Mapbox Token")
+            st.stop()
+
+    # ───── 当前区域组 & GeoJSON ──────────────────────────────
+    view = views[sel_group]["view"]
+    geo_files = view["geo文件"].unique().tolist()
+    if len(geo_files) != 1:
+        st.error("同一『地理区域组』应指向唯一 geo文件，请检查 Excel")
+        st.stop()
+
+    # ───── 颜色映射（按“分组”）与州 / 城市拆分：共享的只读视图 ──
+    grp_vals = views[sel_group]["grp_vals"]
+    color_map = views[sel_group]["color_map"]
+    states = views[sel_group]["states"]
+    cities = views[sel_group]["cities"]
+
+    # ───── 城市坐标（本地地名库 → 缓存 → 并发 Geocoding） ─────
+    points, failures = locate_cities(cities, token)
+    for failure in failures:
+        st.warning(failure)
+
+    # ───── 构建图表（按数据版本 + 控件状态缓存） ───────────────
+    geo_path = check_geo(DB / geo_files[0])
+
+    fig = figure_cache.get_or_build(
+        "areas_map",
+        {"areas": data_store.version("areas"), "geo": geo_index.geo_version(geo_path)},
+        {"group": sel_group, "zoom": zoom, "cities": [points["lat"], points["lon"], points["text"]]},
+        lambda: build_figure(states, color_map, geo_path, zoom, points)
+    )
+    if token:
+        fig.update_layout(mapbox_accesstoken=token)
+    else:
+        # 前景已绘制视图内的州，背景只需其余州的粗略边界
+        basemap.apply(fig, geo_path, basemap.BACKGROUND_TOLERANCE, exclude=states["代码"])
+    fig.update_layout(margin=dict(l=0,r=0,t=0,b=0))
+
+    # ───── 区域内的路线地点（点在多边形内） ─────────────────
+    show_stops = st.checkbox("显示区域内的路线地点")
+    if show_stops:
+        sel_parts = st.multiselect("按『分组』筛选区域", grp_vals, default=grp_vals)
+        codes = states.loc[states["分组"].isin(sel_parts), "代码"]
+        routes = data_store.load("routes")
+        with instrument.span("stops_in_region"):
+            tags = data_store.derived("routes", spatial_index.tag_points,
+                                      str(geo_path), geo_index.geo_version(geo_path))
+            region_names = dict(zip(states["代码"], states["名称(中文)"]))
+            inside = tags[tags.isin(codes)]
+            stops = routes.loc[inside.index].assign(所在区域=inside.map(region_names))
+        fig.add_scattermapbox(
+            lat=stops["latitude"], lon=stops["longitude"],
+            text=stops["地点名称"],
+            mode="markers",
+            marker=dict(size=9, color="darkblue"),
+            hovertext=stops["地点名称"] + "（" + stops["线路名称"] + "）",
+            hoverinfo="text",
+            name="路线地点",
+            showlegend=False
+        )
+
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
 
     # ───── 下载按钮 ─────────────────────────────────────────
     csv_bytes = view.to_csv(index=False, encoding="utf-8-sig").encode()
@@ -169,8 +233,18 @@ def run():
         mime="text/csv"
     )
 
+    if show_stops:
+        st.markdown("### 区域内的路线地点")
+        if stops.empty:
+            st.info("所选区域内没有路线地点")
+        else:
+            paged_table.paged_table(
+                stops, key="areas_stops_table",
+                columns=["所在区域", "线路名称", "序号", "地点名称", "地点名称(英文)", "主要人物"]
+            )
+
     st.markdown("### 当前区域组数据预览")
-    st.dataframe(view, hide_index=True)
+    paged_table.paged_table(view, key="areas_table", long_text_columns=["描述"])
 
 # 运行应用
 if __name__ == "__main__":
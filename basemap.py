@@ -0,0 +1,133 @@
+# basemap.py ────────────────────────────────────────────────
+"""离线底图
+
+不依赖 Mapbox 令牌和远程瓦片：地图样式改为 white-bg，把 database/ 下的
+GeoJSON 作为 mapbox 图层绘制在数据轨迹之下。图层按文件版本只构建一次，
+各会话共享。
+
+底图文件中 properties.kind 区分要素：
+land 陆地、sea 海、lake 湖、island 岛屿（按陆地着色）、river 河流、label 地名；
+没有 kind 的要素（如 us_states_simple.geojson 的州界）只描边，不再重复一份填充。
+作为区域图背景时，exclude 去掉前景已绘制的要素，其余边界按 BACKGROUND_TOLERANCE
+粗略简化，不随缩放级别重新下发全部精细边界。
+"""
+import math
+import pathlib
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import plotly.graph_objects as go
+
+import data_store
+import geo_index
+import geo_simplify
+
+NEAR_EAST = data_store.DB / "near_east_basemap.geojson"
+US_STATES = data_store.DB / "us_states_simple.geojson"
+
+LAND_COLOR = "#f3ecd8"
+WATER_COLOR = "#aacbe9"
+COAST_COLOR = "#7a7a7a"
+RIVER_COLOR = "#5b8fc9"
+LABEL_COLOR = "#6b5b45"
+
+OFFLINE = "离线底图（无需令牌）"
+MAPBOX = "Mapbox 在线地图"
+MODES = [OFFLINE, MAPBOX]
+
+BACKGROUND_TOLERANCE = 0.1      # 背景边界的简化容差（度），只需粗略轮廓
+
+_lock = threading.Lock()
+_cache: Dict[Tuple[pathlib.Path, str, Optional[float], FrozenSet[str]],
+             Tuple[List[Dict[str, Any]], Dict[str, list]]] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"底图图层": dict(_cache)}
+
+
+def _collection(features: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"type": "FeatureCollection", "features": features}
+
+
+def build_layers(geo: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, list]]:
+    """GeoJSON -> (mapbox 图层列表, 地名 {lat, lon, text})"""
+    by_kind: Dict[str, List[Dict[str, Any]]] = {}
+    for feature in geo["features"]:
+        kind = (feature.get("properties") or {}).get("kind", "border")
+        by_kind.setdefault(kind, []).append(feature)
+
+    layers = []
+    fills = [("land", LAND_COLOR), ("sea", WATER_COLOR), ("lake", WATER_COLOR), ("island", LAND_COLOR)]
+    for kind, color in fills:
+        if kind in by_kind:
+            layers.append(dict(sourcetype="geojson", source=_collection(by_kind[kind]),
+                               type="fill", color=color, below="traces"))
+    # 海岸线 / 边界：海、湖、岛屿的轮廓，以及无 kind 的边界要素
+    outlined = [f for kind in ("sea", "lake", "island", "border") for f in by_kind.get(kind, [])]
+    if outlined:
+        layers.append(dict(sourcetype="geojson", source=_collection(outlined),
+                           type="line", color=COAST_COLOR, line=dict(width=0.8), below="traces"))
+    if "river" in by_kind:
+        layers.append(dict(sourcetype="geojson", source=_collection(by_kind["river"]),
+                           type="line", color=RIVER_COLOR, line=dict(width=1.5), below="traces"))
+
+    labels: Dict[str, list] = {"lat": [], "lon": [], "text": []}
+    for feature in by_kind.get("label", []):
+        lon, lat = feature["geometry"]["coordinates"]
+        labels["lat"].append(lat)
+        labels["lon"].append(lon)
+        labels["text"].append(feature["properties"]["name"])
+    return layers, labels
+
+
+def _round_coords(coords: Any, digits: int) -> Any:
+    if coords and isinstance(coords[0], (int, float)):
+        return [round(c, digits) for c in coords]
+    return [_round_coords(c, digits) for c in coords]
+
+
+def layers(path: pathlib.Path, tolerance: Optional[float] = None, exclude: Iterable[str] = ()
+           ) -> Tuple[List[Dict[str, Any]], Dict[str, list]]:
+    """按文件版本（及简化容差、排除的要素）缓存的底图图层
+
+    tolerance 仅适用于只含多边形的文件（如州界），按 geo_simplify 简化后再绘制，
+    坐标只保留比容差高两位的小数；exclude 为不绘制的要素 id。
+    """
+    path = pathlib.Path(path)
+    version = geo_index.geo_version(path)
+    exclude = frozenset(exclude)
+    key = (path, version, tolerance, exclude)
+    with _lock:
+        if key not in _cache:
+            for old in [k for k in _cache if k[0] == path and k[1] != version]:
+                del _cache[old]
+            geo = (geo_index.load_geo(path) if tolerance is None
+                   else geo_simplify.simplified(path, tolerance))
+            features = [f for f in geo["features"] if f.get("id") not in exclude]
+            if tolerance:
+                digits = 2 - math.floor(math.log10(tolerance))
+                features = [{**f, "geometry": {**f["geometry"],
+                                               "coordinates": _round_coords(f["geometry"]["coordinates"], digits)}}
+                            for f in features]
+            geo = {**geo, "features": features}
+            _cache[key] = build_layers(geo)
+        return _cache[key]
+
+
+def apply(fig: go.Figure, path: pathlib.Path = NEAR_EAST, tolerance: Optional[float] = None,
+          exclude: Iterable[str] = ()) -> go.Figure:
+    """把图表切换为离线底图（原地修改并返回 fig）
+
+    地名作为最后一条文本轨迹加入，不影响已有轨迹的序号（动画帧按序号引用轨迹）。
+    """
+    map_layers, labels = layers(path, tolerance, exclude)
+    fig.update_layout(mapbox_style="white-bg", mapbox_layers=map_layers)
+    if labels["text"]:
+        fig.add_trace(go.Scattermapbox(
+            lat=labels["lat"], lon=labels["lon"], text=labels["text"], mode="text",
+            textfont=dict(size=13, color=LABEL_COLOR), hoverinfo="skip", showlegend=False
+        ))
+    return fig
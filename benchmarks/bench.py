@@ -0,0 +1,257 @@
+# benchmarks/bench.py ───────────────────────────────────────
+"""子应用无界面基准测试
+
+用 Streamlit AppTest 在无浏览器的情况下运行各子应用的 run()，记录：
+· load    数据解析 + 同步到存储后端
+· filter  存储后端的查询（select / distinct）
+· figure  图表构建（figure_cache 未命中时的 build）
+· geocode 城市坐标解析（已替换为本地桩，不访问网络）
+· total   整次 rerun 的耗时，以及页面中图表 JSON 的字节数
+
+每个放大倍数（synthetic.generate）在独立的子进程中运行，避免进程级缓存
+在不同规模之间复用。地图页面默认使用离线底图（basemap），无需令牌；若页面
+要求令牌则填入占位值。AppTest 不渲染地图，不会请求瓦片。
+
+用法：
+    python benchmarks/bench.py                      # 1×/10×/100×，与基线比较
+    python benchmarks/bench.py --scales 1 10 100 1000
+    python benchmarks/bench.py --ingest             # 先编译为 Arrow 文件再测
+    python benchmarks/bench.py --save               # 把结果写为新基线
+超出基线（相对 tolerance 且绝对差超过 MIN_DELTA_S）时以非零状态退出。
+"""
+import argparse
+import functools
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+HERE = pathlib.Path(__file__).resolve().parent
+BASELINE = HERE / "baselines" / "baseline.json"
+RESULTS = HERE / "results" / "latest.json"
+
+PAGES = ["kings_story", "prophets_story", "characters_story", "routes_map", "areas_map"]
+SCALES = (1, 10, 100)
+PHASES = ("load", "filter", "figure", "geocode")
+TOKEN = "pk.benchmark"
+TOLERANCE = 0.5         # 相对基线允许的增幅
+MIN_DELTA_S = 0.25      # 小于该绝对差的耗时变化不视为回归
+
+
+# ───── 分阶段计时 ─────────────────────────────────────────────
+class Recorder:
+    """按阶段累计耗时；嵌套调用只计入最内层阶段（排他时间）"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self._local = threading.local()
+
+    def reset(self) -> Dict[str, float]:
+        totals, self.totals = self.totals, dict.fromkeys(PHASES, 0.0)
+        return totals
+
+    def wrap(self, phase: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)               # 子阶段耗时
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                inner = stack.pop()
+                self.totals[phase] += elapsed - inner
+                if stack:
+                    stack[-1] += elapsed
+        return timed
+
+
+def _stub_geocode(url: str, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """按查询文本生成确定的美国境内坐标"""
+    text = url.rsplit("/", 1)[-1]
+    h = sum(map(ord, text))
+    return {"features": [{"center": [-120 + h % 50, 30 + h % 17]}]}
+
+
+def instrument(recorder: Recorder) -> None:
+    """在子应用导入前替换各阶段入口（只在基准测试子进程中调用）"""
+    import data_store
+    import figure_cache
+    import geocoding
+    import storage
+
+    for name, (file_name, read) in data_store.DATASETS.items():
+        data_store.DATASETS[name] = (file_name, recorder.wrap("load", read))
+    data_store.normalize = recorder.wrap("load", data_store.normalize)
+    data_store.load_compiled = recorder.wrap("load", data_store.load_compiled)
+    storage.Backend.sync = recorder.wrap("load", storage.Backend.sync)
+    storage.Backend.select = recorder.wrap("filter", storage.Backend.select)
+    storage.Backend.distinct = recorder.wrap("filter", storage.Backend.distinct)
+
+    get_or_build = figure_cache.get_or_build
+
+    def timed_get_or_build(namespace, versions, state, build):
+        return get_or_build(namespace, versions, state, recorder.wrap("figure", build))
+    figure_cache.get_or_build = timed_get_or_build
+
+    class StubGeocoder(geocoding.Geocoder):
+        def __init__(self, token, cache, **kwargs):
+            kwargs.setdefault("backend", _stub_geocode)
+            kwargs.setdefault("rate", 1e6)
+            super().__init__(token, cache, **kwargs)
+
+        resolve = recorder.wrap("geocode", geocoding.Geocoder.resolve)
+    geocoding.Geocoder = StubGeocoder
+
+
+# ───── 单个页面 ───────────────────────────────────────────────
+def _figure_bytes(at) -> int:
+    return sum(len(chart.proto.spec.encode()) for chart in at.get("plotly_chart"))
+
+
+def _run(at, recorder: Recorder) -> Dict[str, float]:
+    recorder.reset()
+    start = time.perf_counter()
+    at.run()
+    total = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{at.exception[0].value}")
+    return {**recorder.reset(), "total": total}
+
+
+def bench_page(module: str, recorder: Recorder, repeats: int) -> Dict[str, Any]:
+    from streamlit.testing.v1 import AppTest
+
+    script = f"import sys; sys.path.insert(0, {str(ROOT)!r})\nimport {module}\n{module}.run()"
+    at = AppTest.from_string(script, default_timeout=600)
+
+    # 冷启动：首次渲染 + 填入令牌后的首次完整渲染
+    runs = [_run(at, recorder)]
+    for text_input in at.text_input:
+        if "Token" in text_input.label or "令牌" in text_input.label:
+            text_input.set_value(TOKEN)
+            runs.append(_run(at, recorder))
+    cold = {key: sum(run[key] for run in runs) for key in runs[0]}
+
+    # 热启动：状态不变的重复 rerun
+    warm_runs = [_run(at, recorder) for _ in range(repeats)]
+    warm = {key: statistics.median(run[key] for run in warm_runs) for key in warm_runs[0]}
+    return {"cold": cold, "warm": warm, "figure_bytes": _figure_bytes(at)}
+
+
+def worker(pages: List[str], repeats: int) -> Dict[str, Any]:
+    """在已设置 BIBLE_STUDY_DB_DIR 的子进程中运行"""
+    sys.path.insert(0, str(ROOT))
+    recorder = Recorder()
+    instrument(recorder)
+    import data_store
+
+    rows = {name: len(data_store.load(name)) for name in data_store.DATASETS}
+    recorder.reset()
+    data_store._entries.clear()         # 让第一个页面承担真实的解析开销
+    return {"rows": rows, "pages": {page: bench_page(page, recorder, repeats) for page in pages}}
+
+
+# ───── 驱动 ───────────────────────────────────────────────────
+def run_scale(scale: int, pages: List[str], repeats: int, ingest: bool = False) -> Dict[str, Any]:
+    sys.path.insert(0, str(HERE))
+    import synthetic
+
+    with tempfile.TemporaryDirectory(prefix=f"bench_{scale}x_") as tmp:
+        data_dir = synthetic.generate(scale, pathlib.Path(tmp) / "database")
+        env = {**os.environ, "BIBLE_STUDY_DB_DIR": str(data_dir),
+               "BIBLE_STUDY_STORAGE": "sqlite", "BIBLE_STUDY_SQLITE": str(data_dir / "bench.sqlite")}
+        env.pop("BIBLE_STUDY_FIGURE_CACHE_DIR", None)
+        if ingest:
+            subprocess.run([sys.executable, str(ROOT / "ingest.py")], env=env, cwd=ROOT,
+                           check=True, capture_output=True)
+        cmd = [sys.executable, __file__, "--worker", "--repeats", str(repeats), "--pages", *pages]
+        out = subprocess.run(cmd, env=env, cwd=ROOT, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f"{scale}× 基准测试失败：\n{out.stderr}")
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """返回超出基线的指标说明"""
+    regressions = []
+    for scale, result in results["scales"].items():
+        base_scale = baseline.get("scales", {}).get(scale)
+        if base_scale is None:
+            continue
+        for page, metrics in result["pages"].items():
+            base = base_scale["pages"].get(page)
+            if base is None:
+                continue
+            for mode in ("cold", "warm"):
+                for key, value in metrics[mode].items():
+                    old = base[mode].get(key)
+                    if old is not None and value > old * (1 + tolerance) and value - old > MIN_DELTA_S:
+                        regressions.append(f"{scale}× {page} {mode}.{key}: {old:.3f}s → {value:.3f}s")
+            old, new = base["figure_bytes"], metrics["figure_bytes"]
+            if new > old * (1 + tolerance):
+                regressions.append(f"{scale}× {page} figure_bytes: {old} → {new}")
+    return regressions
+
+
+def report(results: Dict[str, Any]) -> None:
+    header = f"{'规模':>6} {'页面':<18}" + "".join(f"{k:>9}" for k in (*PHASES, "total")) + f"{'warm':>9}{'图表KB':>9}"
+    print(header)
+    for scale, result in results["scales"].items():
+        for page, m in result["pages"].items():
+            cold = "".join(f"{m['cold'][k]:9.3f}" for k in (*PHASES, "total"))
+            print(f"{scale + '×':>6} {page:<18}{cold}{m['warm']['total']:9.3f}{m['figure_bytes'] / 1024:9.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--ingest", action="store_true", help="先用 ingest.py 编译合成数据")
+    parser.add_argument("--save", action="store_true", help="把结果写为新基线")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.pages, args.repeats)))
+        return 0
+
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scales": {str(scale): run_scale(scale, args.pages, args.repeats, args.ingest)
+                   for scale in args.scales},
+    }
+    report(results)
+    RESULTS.parent.mkdir(exist_ok=True)
+    RESULTS.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.save:
+        baseline = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {"scales": {}}
+        baseline.update({k: v for k, v in results.items() if k != "scales"})
+        baseline["scales"].update(results["scales"])
+        BASELINE.write_text(json.dumps(baseline, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"基线已写入 {BASELINE}")
+        return 0
+    if not BASELINE.exists():
+        print("尚无基线，使用 --save 生成")
+        return 0
+    regressions = compare(results, json.loads(BASELINE.read_text(encoding="utf-8")), args.tolerance)
+    for line in regressions:
+        print("回归：", line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/synthetic.py ───────────────────────────────────
+"""合成数据生成
+
+把 database/ 下的每个数据表复制 factor 份写入新目录，供基准测试把
+BIBLE_STUDY_DB_DIR 指向该目录。各数据集的放大方式尽量贴近数据的真实增长：
+· 诸王 / 先知 / 领袖：名称加副本后缀，分类不变（默认选中项随之放大）；
+· 路线：每条线路的地点数放大，坐标小幅偏移、序号顺延；
+· 区域：按“地理区域组”整组复制，单组规模不变。
+其余文件（GeoJSON、锚点等）原样复制。
+"""
+import pathlib
+import shutil
+import sys
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import data_store  # noqa: E402
+
+# 不复制的运行时文件
+SKIP = {"bible_study.sqlite", "city_cache.json"}
+
+
+def _copies(frame: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """frame 复制 factor 份，附副本编号列 _copy"""
+    out = pd.concat([frame] * factor, ignore_index=True)
+    out["_copy"] = np.repeat(np.arange(factor), len(frame))
+    return out
+
+
+def _suffix(values: pd.Series, copy: pd.Series) -> pd.Series:
+    """第 0 份保持原值，其余加 `·k` 后缀"""
+    text = values.astype(str).str.strip()
+    return text.where(copy == 0, text + "·" + copy.astype(str)).where(values.notna())
+
+
+def _named(*columns: str) -> Callable[[pd.DataFrame, int], pd.DataFrame]:
+    def scale(frame: pd.DataFrame, factor: int) -> pd.DataFrame:
+        out = _copies(frame, factor)
+        for col in columns:
+            out[col] = _suffix(out[col], out["_copy"])
+        return out.drop(columns="_copy")
+    return scale
+
+
+def _scale_routes(frame: pd.DataFrame, factor: int) -> pd.DataFrame:
+    out = _copies(frame, factor)
+    out["地点名称"] = _suffix(out["地点名称"], out["_copy"])
+    # 同一线路内副本依次接在原线路之后，坐标沿小圆偏移
+    out = out.sort_values(["_copy"], kind="stable")
+    out = out.iloc[np.argsort(pd.factorize(out["线路名称"])[0], kind="stable")]
+    out["序号"] = out.groupby("线路名称", sort=False).cumcount() + 1
+    coords = out["位置信息(经纬度)"].str.split(",", expand=True)
+    angle = out["_copy"].to_numpy() * 2.399963     # 黄金角，副本不重叠
+    radius = 0.05 * np.sqrt(out["_copy"].to_numpy())
+    lat = pd.to_numeric(coords[0].str.strip(), errors="coerce") + radius * np.sin(angle)
+    lon = pd.to_numeric(coords[1].str.strip(), errors="coerce") + radius * np.cos(angle)
+    out["位置信息(经纬度)"] = (lat.round(6).astype(str) + ", " + lon.round(6).astype(str)
+                               ).where(lat.notna() & lon.notna(), out["位置信息(经纬度)"])
+    return out.drop(columns="_copy")
+
+
+def _scale_areas(frame: pd.DataFrame, factor: int) -> pd.DataFrame:
+    out = _copies(frame, factor)
+    out["地理区域组"] = _suffix(out["地理区域组"], out["_copy"])
+    return out.drop(columns="_copy")
+
+
+SCALERS: Dict[str, Callable[[pd.DataFrame, int], pd.DataFrame]] = {
+    "kings":      _named("king_name_cn", "king_name_en"),
+    "prophets":   _named("先知名称", "先知英文名称"),
+    "characters": _named("中文名称", "英文名称"),
+    "routes":     _scale_routes,
+    "areas":      _scale_areas,
+}
+
+
+def generate(factor: int, out_dir: pathlib.Path, src: pathlib.Path = data_store.DB) -> pathlib.Path:
+    """在 out_dir 下生成放大 factor 倍的数据目录"""
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tables = {file_name: name for name, (file_name, _) in data_store.DATASETS.items()}
+    for file_path in src.iterdir():
+        if file_path.is_dir() or file_path.name in SKIP:
+            continue
+        name = tables.get(file_path.name)
+        if name is None:
+            shutil.copy2(file_path, out_dir / file_path.name)
+        elif file_path.suffix == ".xlsx":
+            frame = pd.read_excel(file_path, dtype=str)
+            SCALERS[name](frame, factor).to_excel(out_dir / file_path.name, index=False)
+        else:
+            frame = pd.read_csv(file_path, dtype=str, keep_default_na=False, na_values=[""])
+            SCALERS[name](frame, factor).to_csv(out_dir / file_path.name, index=False)
+    return out_dir
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成放大的合成数据目录")
+    parser.add_argument("factor", type=int)
+    parser.add_argument("out_dir", type=pathlib.Path)
+    args = parser.parse_args()
+    print(generate(args.factor, args.out_dir))
@@ -1,10 +1,56 @@
-import pandas as pd
-import plotly.graph_objects as go
 import streamlit as st
+import data_store
+import timeline
+import figure_cache
+import storage
+import contemporaries
+import paged_table
+import instrument
+
+# 为不同的人物类型分配颜色
+COLORS = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+# 默认选择的人物类型与可选的评分类型
+DEFAULT_TYPES = ['4-国王(犹大)', '4-国王(统一王国)']
+SCORE_TYPES = ('重要度评分', '信仰状态评分')
+
+def build_figure(filtered_data, score_type, character_types, webgl=None):
+    """人物编年史：每个人物类型一条 trace；character_types 决定颜色分配顺序"""
+    styles = {
+        character_type: dict(line=dict(dash='solid', color=COLORS[i % len(COLORS)]),
+                             marker=dict(symbol='circle', size=10))
+        for i, character_type in enumerate(character_types)
+    }
+    fig = timeline.build_timeline(
+        filtered_data,
+        start='任期开始年份', end='任期结束年份', y=score_type,
+        label='中文名称', category='人物类型',
+        hover_fields=[('人物类型', '人物类型'),
+                      ('任期时长', '任期时长'),
+                      ('任期开始年份', '任期开始年份'),
+                      ('任期结束年份', '任期结束年份'),
+                      ('主要故事', '主要故事'),
+                      (score_type, score_type),
+                      ('评分原因', score_type + '原因'),
+                      ('相关书卷', '相关书卷'),
+                      ('被提到的次数', '被提及次数')],
+        styles=styles,
+        webgl=webgl
+    )
+
+    # 更新布局
+    yaxis_range = [0, 11] if score_type == '重要度评分' else [-6, 6]
+    fig.update_layout(
+        xaxis_title="年份",
+        yaxis_title=score_type,
+        yaxis=dict(range=yaxis_range, dtick=1),
+        showlegend=False
+    )
+    return fig
 
 def run():
-    # Load the CSV file
-    df = pd.read_csv('database/characters_file.csv')
+    # 数据通过存储后端按需查询
+    db = storage.get_backend()
 
     # Streamlit 应用
     st.title("以色列各历史时期领袖")
@@ -12,60 +58,36 @@ def run():
     st.subheader('1.编年史', divider='rainbow')
 
     # 创建一个多选菜单来选择人物类型
-    character_types = df['人物类型'].unique()
-    default_types = ['4-国王(犹大)', '4-国王(统一王国)']  # 默认选择的值
-    selected_character_types = st.multiselect('选择一个或多个人物类型', character_types, default=default_types)
+    character_types = db.distinct('characters', '人物类型')
+    selected_character_types = st.multiselect('选择一个或多个人物类型', character_types, default=DEFAULT_TYPES)
 
     # 创建一个单选按钮来选择评分类型
     score_type = st.radio(
         "选择要展示的评分类型",
-        ('重要度评分', '信仰状态评分')
+        SCORE_TYPES
     )
 
     # 根据选择的人物类型过滤数据
-    filtered_data = df[df['人物类型'].isin(selected_character_types)]
+    filtered_data = db.select('characters', {'人物类型': selected_character_types})
 
     # 准备可视化数据
-    fig = go.Figure()
-
-    # 为不同的人物类型分配颜色
-    colors = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
-    type_to_color = {character_type: colors[i % len(colors)] for i, character_type in enumerate(character_types)}
-
-    for _, row in filtered_data.iterrows():
-        y_value = row[score_type]
-        hover_text = (f"{row['中文名称']}<br>人物类型: {row['人物类型']}<br>任期时长: {row['任期时长']}<br>任期开始年份: {row['任期开始年份']}<br>任期结束年份: {row['任期结束年份']}<br>主要故事: {row['主要故事']}<br>"
-                      f"{score_type}: {y_value}<br>评分原因: {row[score_type + '原因']}<br>相关书卷: {row['相关书卷']}<br>被提到的次数: {row['被提及次数']}")
-
-        fig.add_trace(go.Scatter(
-            x=[row['任期开始年份'], row['任期结束年份']],
-            y=[y_value, y_value],
-            mode='lines+markers+text',
-            name=row['中文名称'],
-            text=[row['中文名称'], ''],
-            textposition="top center",
-            line=dict(dash='solid', color=type_to_color[row['人物类型']]),
-            marker=dict(symbol='circle', size=10),
-            hovertext=hover_text,
-            hoverinfo='text+name'
-        ))
-
-    # 更新布局
-    yaxis_range = [0, 11] if score_type == '重要度评分' else [-6, 6]
-    fig.update_layout(
-        xaxis_title="年份",
-        yaxis_title=score_type,
-        yaxis=dict(range=yaxis_range, dtick=1),
-        showlegend=False
+    fig = figure_cache.get_or_build(
+        'characters_timeline',
+        {'characters': data_store.version('characters')},
+        {'character_types': set(selected_character_types), 'score_type': score_type},
+        lambda: build_figure(filtered_data, score_type, character_types)
     )
 
     # 显示图表
-    st.plotly_chart(fig, use_container_width=True)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
 
     st.subheader('2.人物志', divider='rainbow')
 
-    st.dataframe(
+    paged_table.paged_table(
         filtered_data,
+        key='characters_table',
+        long_text_columns=['主要故事', '重要度评分原因', '信仰状态评分原因'],
         column_config={
             '重要度评分': st.column_config.ProgressColumn(
                 '重要度评分',
@@ -75,12 +97,14 @@ def run():
                 max_value=10,
                 width='small'
             )
-        },
-        hide_index=True,
-        use_container_width=True
+        }
     )
 
-    st.subheader('3.评分依据及标准', divider='rainbow')
+    st.subheader('3.同时期人物', divider='rainbow')
+
+    contemporaries.contemporaries_panel('characters', key='characters')
+
+    st.subheader('4.评分依据及标准', divider='rainbow')
 
     col1, col2 = st.columns(2)
     
@@ -0,0 +1,83 @@
+# chronology.py ─────────────────────────────────────────────
+"""年代与时长文本的规范化
+
+数据中的日期是显示用文本：`前1446年`、`公元50年`、`约前1000年`、`前10世纪`、
+`不详`；停留时间是 `1天`、`1年6个月`、`约1年`、`2年多`、`数月`、`短暂停留`。
+parse_years() / parse_durations() 用向量化的字符串操作把整列转换为数值：
+· 年份为带符号的年（公元前为负，不设公元 0 年，`前1446年` 即 -1446）；
+· 时长统一为天数；
+· approx 标记“约 / 多 / 数月”等估计值，unknown 标记“不详”及无法识别的文本。
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+DAYS = {"年": 365.25, "个月": 30.44, "月": 30.44, "周": 7.0, "天": 1.0, "日": 1.0}
+
+# 无数字的模糊时长 -> 估计天数（均标记为 approx）
+VAGUE_DURATIONS: Dict[str, float] = {
+    "数天": 3, "几天": 3, "若干天": 3, "短暂停留": 1,
+    "数周": 21, "几周": 21,
+    "数月": 90, "几个月": 90, "若干月": 90,
+    "数年": 3 * 365.25, "几年": 3 * 365.25, "若干年": 3 * 365.25,
+}
+
+UNKNOWN = {"", "不详", "未知", "不明", "?", "？"}
+
+_YEAR = (r"^(?P<approx>约|大约|约在)?\s*(?P<era>公元前|主前|前|公元|主后)?\s*"
+         r"(?P<n>\d+)\s*(?P<unit>年|世纪)?\s*(?P<approx2>左右|前后)?$")
+_PART = r"(?P<n>\d+(?:\.\d+)?)\s*(?P<unit>年|个月|月|周|天|日)"
+_DURATION_TEXT = r"^(?:约|大约)?\s*(?:\d+(?:\.\d+)?\s*(?:年|个月|月|周|天|日)\s*(?:多|余)?\s*)+(?:左右)?$"
+
+
+def _clean(values: pd.Series) -> pd.Series:
+    return values.astype("str").str.strip().where(values.notna(), "")
+
+
+def parse_years(values: pd.Series) -> pd.DataFrame:
+    """年代文本 -> DataFrame(year, approx, unknown)，索引与输入一致"""
+    text = _clean(values)
+    parts = text.str.extract(_YEAR)
+    n = pd.to_numeric(parts["n"], errors="coerce")
+    bce = parts["era"].isin(["公元前", "主前", "前"])
+    century = parts["unit"] == "世纪"
+    # 世纪取其中点：前10世纪 -> -950，公元1世纪 -> 50
+    year = n.where(~century, n * 100 - 50)
+    year = year.where(~bce, -year)
+    approx = parts["approx"].notna() | parts["approx2"].notna() | century
+    return pd.DataFrame({
+        "year": year.astype("float64"),
+        "approx": approx & year.notna(),
+        "unknown": year.isna(),
+    }, index=values.index)
+
+
+def parse_durations(values: pd.Series) -> pd.DataFrame:
+    """时长文本 -> DataFrame(days, approx, unknown)，索引与输入一致"""
+    text = _clean(values)
+    structured = text.str.match(_DURATION_TEXT)
+    parts = text[structured].str.extractall(_PART)
+    amount = pd.to_numeric(parts["n"]) * parts["unit"].map(DAYS)
+    days = amount.groupby(level=0).sum().reindex(text.index)
+    vague = text.map(VAGUE_DURATIONS).astype("float64")
+    days = days.fillna(vague)
+    approx = (text.str.contains(r"约|多|余|左右", regex=True) & structured) | vague.notna()
+    return pd.DataFrame({
+        "days": days.astype("float64"),
+        "approx": approx & days.notna(),
+        "unknown": days.isna(),
+    }, index=values.index)
+
+
+def unrecognized(values: pd.Series, unknown: pd.Series) -> pd.Series:
+    """无法识别的文本（不含“不详”等明确的未知值）"""
+    return unknown & ~_clean(values).isin(UNKNOWN)
+
+
+def format_year(year: float) -> str:
+    """-1446 -> 前1446年，50 -> 公元50年"""
+    if year is None or np.isnan(year):
+        return "不详"
+    year = int(year)
+    return f"前{-year}年" if year < 0 else f"公元{year}年"
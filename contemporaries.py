@@ -0,0 +1,112 @@
+# contemporaries.py ─────────────────────────────────────────
+"""跨数据集“同时期人物”
+
+诸王、先知、领袖三个数据集的在位 / 任期区间合并为一张年表，按各数据集
+版本构建一次区间树（interval_tree），供各编年史页面的“同时期人物”面板查询。
+"""
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import data_store
+import instrument
+from interval_tree import IntervalTree
+
+# 数据集 -> (显示名, 名称列, 开始列, 结束列, 分类列)
+SOURCES: Dict[str, Tuple[str, str, str, str, str]] = {
+    "kings":      ("诸王", "king_name_cn", "start_year",   "end_year",     "kingdom"),
+    "prophets":   ("先知", "先知名称",     "开始年份",     "结束年份",     "先知类型"),
+    "characters": ("领袖", "中文名称",     "任期开始年份", "任期结束年份", "人物类型"),
+}
+
+
+class Chronology:
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self.tree = IntervalTree(table["开始"].to_numpy(), table["结束"].to_numpy())
+
+    def overlapping(self, start: float, end: float) -> pd.DataFrame:
+        """与 [start, end] 重叠的条目，附重叠年数"""
+        rows = self.table.iloc[self.tree.overlap(start, end)]
+        overlap = (np.minimum(rows["结束"], max(start, end))
+                   - np.maximum(rows["开始"], min(start, end)))
+        return rows.assign(重叠年数=overlap.astype(int))
+
+    def alive_at(self, year: float) -> pd.DataFrame:
+        """year 年在位 / 在任的条目"""
+        return self.table.iloc[self.tree.stab(year)]
+
+
+def build_chronology() -> Chronology:
+    frames: List[pd.DataFrame] = []
+    for dataset, (label, name_col, start_col, end_col, group_col) in SOURCES.items():
+        frame = data_store.load(dataset)
+        frames.append(pd.DataFrame({
+            "数据集": dataset,
+            "类别": label,
+            "名称": frame[name_col].astype(str).str.strip(),
+            "分类": frame[group_col],
+            "开始": pd.to_numeric(frame[start_col], errors="coerce"),
+            "结束": pd.to_numeric(frame[end_col], errors="coerce"),
+        }))
+    table = pd.concat(frames, ignore_index=True)
+    # 只有一端年份已知的条目按单一年份处理，两端都缺失的条目不进入年表
+    table["开始"] = table["开始"].fillna(table["结束"])
+    table["结束"] = table["结束"].fillna(table["开始"])
+    return Chronology(table.dropna(subset=["开始", "结束"]))
+
+
+_lock = threading.Lock()
+_cache: Dict[Tuple[str, ...], Chronology] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"同期人物": dict(_cache)}
+
+
+def get_chronology() -> Chronology:
+    """按各数据集版本缓存的年表"""
+    key = tuple(data_store.version(name) for name in SOURCES)
+    with _lock:
+        if key not in _cache:
+            _cache.clear()
+            _cache[key] = build_chronology()
+        return _cache[key]
+
+
+@instrument.timed("contemporaries")
+def contemporaries_panel(dataset: str, key: str) -> None:
+    """选择本数据集中的一位人物，列出与其时期重叠的其他人物
+
+    其他数据集中名称与起止年份都相同的条目视为同一人（如诸王与领袖中的同一位王），
+    不列出；同名但年份不同的人（如北国与南国的约兰）照常列出。
+    """
+    chronology = get_chronology()
+    own = chronology.table[chronology.table["数据集"] == dataset]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        choice = st.selectbox('选择人物', own.index,
+                              format_func=lambda i: f"{own.at[i, '名称']}（{own.at[i, '分类']}）",
+                              key=f"{key}_person")
+    with col2:
+        labels = [label for label, *_ in SOURCES.values()]
+        shown = st.multiselect('显示类别', labels, default=labels, key=f"{key}_labels")
+
+    person = own.loc[choice]
+    st.caption(f"{person['名称']}：{int(person['开始'])} 至 {int(person['结束'])} 年")
+    result = chronology.overlapping(person["开始"], person["结束"])
+    same_person = ((result["名称"] == person["名称"]) & (result["开始"] == person["开始"])
+                   & (result["结束"] == person["结束"]))
+    result = result[(result.index != choice) & ~same_person & result["类别"].isin(shown)]
+    st.dataframe(
+        result[["类别", "名称", "分类", "开始", "结束", "重叠年数"]]
+        .sort_values(["重叠年数", "开始"], ascending=[False, True]),
+        hide_index=True,
+        use_container_width=True
+    )
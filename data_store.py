@@ -0,0 +1,322 @@
+# data_store.py ─────────────────────────────────────────────
+"""数据集注册中心
+
+database/ 下的每个数据文件在每个进程内只解析一次，结果由所有会话共享；
+文件 mtime / 大小变化时重新计算内容哈希，内容确有变化才重新解析，
+因此修改 CSV 后无需重启服务即可生效。
+
+返回的 DataFrame 为共享对象，调用方不得原地修改。
+
+若 database/compiled/ 中有 ingest.py 生成的 Arrow 文件，且清单记录的源文件
+哈希与当前文件一致，则以内存映射方式读取，跳过解析与类型转换。
+
+否则由第一个需要它的进程解析，并写入共享目录（默认 database/shared/，
+环境变量 BIBLE_STUDY_SHARED_DIR）供同机的其他进程内存映射读取，见 shared_cache。
+多个副本同时启动时只有一个进程解析，其余等待后直接映射。
+
+数据目录默认为仓库下的 database/，可用环境变量 BIBLE_STUDY_DB_DIR 指向
+其他目录（如基准测试生成的合成数据）。
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import chronology
+import instrument
+import shared_cache
+
+logger = logging.getLogger(__name__)
+
+DB = pathlib.Path(os.environ.get("BIBLE_STUDY_DB_DIR")
+                  or pathlib.Path(__file__).resolve().parent / "database")
+SHARED_DIR = pathlib.Path(os.environ.get("BIBLE_STUDY_SHARED_DIR") or DB / "shared")
+
+
+# ───── 读取 ───────────────────────────────────────────────────
+def _read_csv(path: pathlib.Path) -> pd.DataFrame:
+    return pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+
+
+def _read_excel(path: pathlib.Path) -> pd.DataFrame:
+    return pd.read_excel(path, dtype=str)
+
+
+# 数据集名称 -> (文件名, 读取函数)；读取函数只读出文本，类型由 SCHEMAS 规范
+DATASETS: Dict[str, Tuple[str, Callable[[pathlib.Path], pd.DataFrame]]] = {
+    "kings":      ("kings_file.csv",      _read_csv),
+    "prophets":   ("prophets_file.csv",   _read_csv),
+    "characters": ("characters_file.csv", _read_csv),
+    "routes":     ("routes_file.csv",     _read_csv),
+    "areas":      ("areas_file.xlsx",     _read_excel),
+}
+
+
+# ───── 列类型 ─────────────────────────────────────────────────
+# str 文本（去首尾空白）、int 整数、float 小数、
+# count 次数（`1000以上` 记为 1000，并在 `<列名>_以上` 中标记为下限）
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "kings": {
+        "kingdom": "str", "king_rank": "int", "king_name_cn": "str", "king_name_en": "str",
+        "start_year": "int", "end_year": "int", "score": "float", "dp_score": "float",
+        "duration": "str", "book": "str", "mentioned_times": "count",
+        "score_reason": "str", "main_story": "str",
+    },
+    "prophets": {
+        "先知类型": "str", "先知排序": "int", "先知名称": "str", "先知英文名称": "str",
+        "开始年份": "int", "结束年份": "int", "先知时长": "str", "主要故事": "str",
+        "重要度评分": "float", "评分原因": "str", "牧师评分": "float", "相关书卷": "str",
+        "被提及次数": "count",
+    },
+    "characters": {
+        "人物类型": "str", "人物类型排序": "int", "中文名称": "str", "英文名称": "str",
+        "任期开始年份": "int", "任期结束年份": "int", "任期时长": "str", "主要故事": "str",
+        "重要度评分": "float", "重要度评分原因": "str", "信仰状态评分": "float",
+        "信仰状态评分原因": "str", "相关书卷": "str", "被提及次数": "count",
+    },
+    "routes": {
+        "线路名称": "str", "序号": "int", "地点名称": "str", "地点名称(英文)": "str",
+        "地点主要信息": "str", "主要人物": "str", "主要历史事件": "str", "地点其他信息": "str",
+        "停留开始日期": "str", "停留结束日期": "str", "停留时间(天/年)": "str", "相关经文": "str",
+        "信息来源": "str", "位置信息(经纬度)": "str", "短评": "str", "信仰状态打分": "int",
+    },
+    "areas": {
+        "地理区域组": "str", "geo文件": "str", "地理类型": "str", "代码": "str",
+        "名称(英文)": "str", "名称(中文)": "str", "分组": "str", "描述": "str",
+    },
+}
+
+
+class SchemaError(ValueError):
+    """数据表缺少必需的列"""
+
+
+def _derive_routes(frame: pd.DataFrame, problems: List[str]) -> None:
+    coords = frame["位置信息(经纬度)"].str.split(",", n=1, expand=True).reindex(columns=[0, 1])
+    frame["latitude"] = pd.to_numeric(coords[0].str.strip(), errors="coerce")
+    frame["longitude"] = pd.to_numeric(coords[1].str.strip(), errors="coerce")
+    bad = frame["位置信息(经纬度)"].notna() & (frame["latitude"].isna() | frame["longitude"].isna())
+    if bad.any():
+        problems.append(f"位置信息(经纬度)：{int(bad.sum())} 行无法解析为经纬度")
+
+    # 年代 / 停留时长：带符号的年份与天数，估计值和“不详”另行标记
+    start = chronology.parse_years(frame["停留开始日期"])
+    end = chronology.parse_years(frame["停留结束日期"])
+    duration = chronology.parse_durations(frame["停留时间(天/年)"])
+    frame["开始年"] = start["year"]
+    frame["结束年"] = end["year"]
+    frame["停留天数"] = duration["days"]
+    frame["日期不确定"] = start["approx"] | start["unknown"] | end["approx"] | end["unknown"]
+    frame["时长不确定"] = duration["approx"] | duration["unknown"]
+    for col, parsed in (("停留开始日期", start), ("停留结束日期", end), ("停留时间(天/年)", duration)):
+        bad = chronology.unrecognized(frame[col], parsed["unknown"])
+        if bad.any():
+            problems.append(f"{col}：{int(bad.sum())} 个值无法识别，如 {frame[col][bad].iloc[0]!r}")
+
+
+# 数据集 -> 派生列函数（原地添加列，问题追加到 problems）
+DERIVED_COLUMNS: Dict[str, Callable[[pd.DataFrame, List[str]], None]] = {
+    "routes": _derive_routes,
+}
+
+_COUNT = r"^(?P<n>\d+)\s*(?P<plus>以上)?$"
+
+
+def normalize(name: str, frame: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """按 SCHEMAS 校验并转换列类型，返回 (新 DataFrame, 问题列表)
+
+    缺少声明的列时抛出 SchemaError；无法转换的值记为空并写入问题列表。
+    """
+    schema = SCHEMAS[name]
+    missing = [col for col in schema if col not in frame.columns]
+    if missing:
+        raise SchemaError(f"{name} 缺少列：{', '.join(missing)}")
+    problems = [f"未声明的列：{col}" for col in frame.columns if col not in schema]
+    out = pd.DataFrame(index=pd.RangeIndex(len(frame)))
+    for col in frame.columns:
+        text = frame[col].reset_index(drop=True).astype("str").str.strip()
+        text = text.where(frame[col].reset_index(drop=True).notna() & (text != ""))
+        kind = schema.get(col, "str")
+        if kind == "str":
+            out[col] = text
+            continue
+        if kind == "count":
+            parts = text.str.extract(_COUNT)
+            values = pd.to_numeric(parts["n"], errors="coerce")
+            out[f"{col}_以上"] = parts["plus"].notna()
+        else:
+            values = pd.to_numeric(text, errors="coerce")
+        bad = text.notna() & values.isna()
+        if bad.any():
+            problems.append(f"{col}：{int(bad.sum())} 个值无法解析为{kind}，如 {text[bad].iloc[0]!r}")
+        if kind in ("int", "count"):
+            values = values.astype("Int64") if values.isna().any() else values.astype("int64")
+        else:
+            values = values.astype("float64")
+        out[col] = values
+    # 次数下限标记列放在对应列之后
+    out = out[[c for col in frame.columns for c in (col, f"{col}_以上") if c in out.columns]]
+    if name in DERIVED_COLUMNS:
+        DERIVED_COLUMNS[name](out, problems)
+    return out, problems
+
+
+def parse(name: str, file_path: pathlib.Path) -> pd.DataFrame:
+    """读取原始文件并规范列类型（未编译或编译结果过期时使用）"""
+    frame, problems = normalize(name, DATASETS[name][1](file_path))
+    for problem in problems:
+        logger.warning("%s：%s", name, problem)
+    return frame
+
+
+# ───── 编译结果（ingest.py 生成的 Arrow 文件） ───────────────────
+FORMAT_VERSION = 2         # 派生列（DERIVED_COLUMNS）变化时递增
+
+
+def compiled_dir() -> pathlib.Path:
+    return DB / "compiled"
+
+
+def manifest_path() -> pathlib.Path:
+    return compiled_dir() / "manifest.json"
+
+
+def schema_fingerprint(name: str) -> str:
+    """列类型定义的摘要；SCHEMAS 或编译格式变化时，已编译文件即视为过期"""
+    text = json.dumps([FORMAT_VERSION, SCHEMAS[name]], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def read_manifest() -> Dict[str, Any]:
+    try:
+        return json.loads(manifest_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"datasets": {}}
+
+
+def compiled_entry(name: str, version: str) -> Optional[Dict[str, Any]]:
+    """与当前源文件版本及列定义一致的清单条目；否则为 None"""
+    entry = read_manifest().get("datasets", {}).get(name)
+    if (entry is None or entry.get("source_hash") != version
+            or entry.get("schema") != schema_fingerprint(name)
+            or not (compiled_dir() / entry["output"]).exists()):
+        return None
+    return entry
+
+
+def load_compiled(name: str, version: str) -> Optional[pd.DataFrame]:
+    """以内存映射方式读取已编译的 Arrow 文件；不存在或已过期时返回 None"""
+    if not shared_cache.available():
+        return None
+    entry = compiled_entry(name, version)
+    if entry is None:
+        if (compiled_dir() / f"{name}.arrow").exists():
+            logger.warning("%s 的编译结果已过期，改为解析原始文件（请运行 ingest.py）", name)
+        return None
+    return shared_cache.read_arrow(compiled_dir() / entry["output"])
+
+
+# ───── 进程间共享的解析结果 ───────────────────────────────────
+def shared_path(name: str, version: str) -> pathlib.Path:
+    """文件名即版本戳：源文件哈希 + 列定义摘要"""
+    return SHARED_DIR / f"{name}-{version}-{schema_fingerprint(name)}.arrow"
+
+
+def load_shared(name: str, version: str, file_path: pathlib.Path) -> pd.DataFrame:
+    """从共享目录映射解析结果；没有时加锁解析并写入，锁内再查一次以免重复解析"""
+    if not shared_cache.available():
+        return parse(name, file_path)
+    target = shared_path(name, version)
+    try:
+        frame = shared_cache.read_arrow(target)
+        if frame is not None:
+            return frame
+        with shared_cache.file_lock(SHARED_DIR / f"{name}.lock"):
+            frame = shared_cache.read_arrow(target)
+            if frame is None:
+                shared_cache.write_arrow(target, parse(name, file_path))
+                shared_cache.prune(SHARED_DIR, f"{name}-", keep=target)
+                frame = shared_cache.read_arrow(target)
+        return frame
+    except OSError as e:        # 共享目录不可写等：退回进程内解析
+        logger.warning("共享缓存不可用（%s），%s 改为进程内解析", e, name)
+        return parse(name, file_path)
+
+
+# ───── 进程级缓存 ─────────────────────────────────────────────
+_lock = threading.RLock()
+_entries: Dict[str, Dict[str, Any]] = {}    # name -> {stamp, version, frame}
+_derived: Dict[Tuple, Any] = {}             # (name, version, fn, args) -> 结果
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {
+            "数据集": {name: entry["frame"] for name, entry in _entries.items()},
+            "派生结果": {(name, fn.rsplit(".", 1)[-1], args): value
+                         for (name, _, fn, args), value in _derived.items()},
+        }
+
+
+def path(name: str) -> pathlib.Path:
+    """数据集对应的文件路径"""
+    return DB / DATASETS[name][0]
+
+
+def file_hash(file_path: pathlib.Path) -> str:
+    """文件内容的 SHA-1 摘要（前 16 位）"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _refresh(name: str) -> Dict[str, Any]:
+    file_path = path(name)
+    stat = file_path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        entry = _entries.get(name)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry
+        version = file_hash(file_path)
+        if entry is not None and entry["version"] == version:
+            # 仅 mtime 变化（如 touch / 重新保存），内容未变
+            entry["stamp"] = stamp
+            return entry
+        with instrument.span(f"parse:{name}"):
+            frame = load_compiled(name, version)
+            if frame is None:
+                frame = load_shared(name, version, file_path)
+        entry = {"stamp": stamp, "version": version, "frame": frame}
+        _entries[name] = entry
+        for key in [k for k in _derived if k[0] == name]:
+            del _derived[key]
+        return entry
+
+
+def load(name: str) -> pd.DataFrame:
+    """返回数据集的共享 DataFrame（只读）"""
+    return _refresh(name)["frame"]
+
+
+def version(name: str) -> str:
+    """数据集当前版本号（内容哈希）"""
+    return _refresh(name)["version"]
+
+
+def derived(name: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """按数据集版本缓存 fn(frame, *args) 的结果，数据更新后自动失效"""
+    entry = _refresh(name)
+    key = (name, entry["version"], f"{fn.__module__}.{fn.__qualname__}", args)
+    with _lock:
+        if key not in _derived:
+            _derived[key] = fn(entry["frame"], *args)
+        return _derived[key]
@@ -0,0 +1,305 @@
+# export_static.py ──────────────────────────────────────────
+"""静态导出
+
+把各子应用的图表与表格按主要选择器的每个取值预先渲染为静态 HTML + JSON，
+写入 dist/，可由任意静态服务器 / CDN 直接提供给匿名读者，无需 Python 会话：
+· 诸王：每个王国，另加全部；
+· 先知：每个先知类型，另加全部；
+· 领袖：（每个人物类型、页面默认组合、全部）× 评分类型；
+· 路线：每条线路（离线底图）及其统计，另加全部线路叠加；
+· 区域：每个地理区域组（离线底图，城市坐标只用地名库与缓存，不发网络请求）。
+多选框的任意子集组合过多，不逐一导出；“全部”页面可点击图例开关各类别。
+
+增量导出：每个输出的键由数据集 / GeoJSON 版本、选择器取值与 EXPORT_VERSION
+算出（figure_cache.make_key），记录在 <输出目录>/manifest.json 中；
+键不变且文件存在时跳过，不再出现的取值对应的旧文件会被删除。
+
+用法：
+    python export_static.py                  # 增量导出到 dist/
+    python export_static.py kings routes     # 只导出指定页面
+    python export_static.py --force          # 全部重新渲染
+    python export_static.py --out site       # 指定输出目录
+"""
+import argparse
+import functools
+import hashlib
+import html
+import json
+import os
+import pathlib
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import basemap
+import data_store
+import figure_cache
+import geo_index
+import storage
+
+EXPORT_VERSION = 4      # 页面模板或渲染方式变化时递增，全部重新导出
+OUT_DIR = pathlib.Path(__file__).resolve().parent / "dist"
+ALL = "全部"
+
+Rendered = Tuple[List[go.Figure], List[Tuple[str, pd.DataFrame]]]     # (图表, [(表名, 表格)])
+
+
+@dataclass(frozen=True)
+class Artifact:
+    page: str
+    title: str
+    label: str                          # 选择器取值的显示名
+    state: Dict[str, Any]               # 选择器取值（参与缓存键与文件名）
+    versions: Dict[str, str]
+    render: Callable[[], Rendered]
+
+    @property
+    def slug(self) -> str:
+        payload = json.dumps(self.state, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+    @property
+    def key(self) -> str:
+        return figure_cache.make_key(f"export_{self.page}", self.versions,
+                                     {**self.state, "format": EXPORT_VERSION})
+
+
+# ───── 各页面 ─────────────────────────────────────────────────
+def _render_timeline(build: Callable, dataset: str, column: str, selected: List[str],
+                     labels: Dict[str, str], table: str) -> Rendered:
+    data = storage.get_backend().select(dataset, {column: selected})
+    return [build(data)], [(table, data.rename(columns=labels))]
+
+
+def _kings() -> Iterator[Artifact]:
+    import kings_story
+    versions = {"kings": data_store.version("kings")}
+    kingdoms = storage.get_backend().distinct("kings", "kingdom")
+    for label, selected in [(ALL, kingdoms)] + [(k, [k]) for k in kingdoms]:
+        yield Artifact("kings", "以色列王国时期诸王", label, {"kingdoms": sorted(selected)}, versions,
+                       functools.partial(_render_timeline, kings_story.build_figure, "kings", "kingdom",
+                                         selected, kings_story.LABELS, "诸王志"))
+
+
+def _prophets() -> Iterator[Artifact]:
+    import prophets_story
+    versions = {"prophets": data_store.version("prophets")}
+    types = storage.get_backend().distinct("prophets", "先知类型")
+    for label, selected in [(ALL, types)] + [(t, [t]) for t in types]:
+        yield Artifact("prophets", "以色列先知时期诸先知", label, {"prophet_types": sorted(selected)}, versions,
+                       functools.partial(_render_timeline, prophets_story.build_figure, "prophets", "先知类型",
+                                         selected, {}, "先知志"))
+
+
+def _render_characters(selected: List[str], score_type: str, all_types: List[str]) -> Rendered:
+    import characters_story
+    data = storage.get_backend().select("characters", {"人物类型": selected})
+    return [characters_story.build_figure(data, score_type, all_types)], [("人物志", data)]
+
+
+def _characters() -> Iterator[Artifact]:
+    import characters_story
+    versions = {"characters": data_store.version("characters")}
+    types = storage.get_backend().distinct("characters", "人物类型")
+    default = [t for t in characters_story.DEFAULT_TYPES if t in types]
+    selections = [(ALL, types), ("默认", default)] + [(t, [t]) for t in types]
+    for score_type in characters_story.SCORE_TYPES:
+        for label, selected in selections:
+            yield Artifact("characters", "以色列各历史时期领袖", f"{label} · {score_type}",
+                           {"character_types": sorted(selected), "score_type": score_type}, versions,
+                           functools.partial(_render_characters, selected, score_type, types))
+
+
+def _render_routes(selected: List[str]) -> Rendered:
+    import routes_map
+    data = routes_map.selected_stops(selected)
+    if len(selected) == 1:
+        fig = routes_map.build_route_figure(data)
+    else:
+        fig = routes_map.build_overlay_figure(data, selected)
+    basemap.apply(fig)
+    summary, legs = data_store.derived("routes", routes_map.route_statistics)
+    return [fig], [("线路统计", summary[summary["线路名称"].isin(selected)]),
+                   ("地点", data[routes_map.TABLE_COLUMNS]),
+                   ("各路段距离", legs[legs["线路名称"].isin(selected)])]
+
+
+def _routes() -> Iterator[Artifact]:
+    versions = {"routes": data_store.version("routes"), "basemap": geo_index.geo_version(basemap.NEAR_EAST)}
+    series = storage.get_backend().distinct("routes", "线路名称")
+    for label, selected in [(ALL, series)] + [(s, [s]) for s in series]:
+        yield Artifact("routes", "历史路线地图", label, {"线路名称": list(selected)}, versions,
+                       functools.partial(_render_routes, selected))
+
+
+def _render_areas(group: str, geo_path: pathlib.Path, points: Dict[str, list]) -> Rendered:
+    import areas_map
+    view = data_store.derived("areas", areas_map.group_views)[group]
+    zoom = areas_map.DEFAULT_ZOOM
+    fig = areas_map.build_figure(view["states"], view["color_map"], geo_path, zoom, points)
+    basemap.apply(fig, geo_path, basemap.BACKGROUND_TOLERANCE, exclude=view["states"]["代码"])
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0))
+    return [fig], [("区域组数据", view["view"])]
+
+
+def _areas() -> Iterator[Artifact]:
+    import areas_map
+    views = data_store.derived("areas", areas_map.group_views)
+    for group, view in views.items():
+        geo_files = view["view"]["geo文件"].unique().tolist()
+        geo_path = data_store.DB / geo_files[0]
+        if len(geo_files) != 1 or not geo_path.exists():
+            print(f"areas：跳过 {group}（geo文件不唯一或不存在）", file=sys.stderr)
+            continue
+        points, failures = areas_map.locate_cities(view["cities"])
+        for failure in failures:
+            print(f"areas：{group}：{failure}", file=sys.stderr)
+        versions = {"areas": data_store.version("areas"), "geo": geo_index.geo_version(geo_path)}
+        # 城市坐标来自地名库 / 缓存，可能独立于数据表变化，因此一并计入键
+        state = {"group": group, "cities": [points["lat"], points["lon"], points["text"]]}
+        yield Artifact("areas", "地理区块标注", group, state, versions,
+                       functools.partial(_render_areas, group, geo_path, points))
+
+
+# 页面 -> 输出列表（按注册顺序生成目录）
+PAGES: Dict[str, Callable[[], Iterator[Artifact]]] = {
+    "kings": _kings,
+    "prophets": _prophets,
+    "characters": _characters,
+    "routes": _routes,
+    "areas": _areas,
+}
+
+
+# ───── 写出 ─────────────────────────────────────────────────
+_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1.5rem; }}
+table.data {{ border-collapse: collapse; font-size: 0.85rem; }}
+table.data th, table.data td {{ border: 1px solid #ddd; padding: 0.25rem 0.5rem; vertical-align: top; }}
+table.data th {{ background: #f5f5f5; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def _write(path: pathlib.Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def render_page(artifact: Artifact, figures: List[go.Figure],
+                tables: List[Tuple[str, pd.DataFrame]]) -> Tuple[str, str]:
+    """-> (HTML, JSON)"""
+    heading = f"{artifact.title} · {artifact.label}"
+    body = [f'<p><a href="../index.html">返回目录</a></p>', f"<h1>{html.escape(heading)}</h1>"]
+    for i, fig in enumerate(figures):
+        body.append(pio.to_html(fig, full_html=False, include_plotlyjs="cdn" if i == 0 else False,
+                                config={"responsive": True}))
+    for name, frame in tables:
+        body.append(f"<h2>{html.escape(name)}</h2>")
+        body.append(frame.to_html(index=False, na_rep="", border=0, classes="data"))
+    page = _TEMPLATE.format(title=html.escape(heading), body="\n".join(body))
+    payload = {
+        "page": artifact.page,
+        "title": artifact.title,
+        "label": artifact.label,
+        "state": artifact.state,
+        "figures": [json.loads(fig.to_json()) for fig in figures],
+        "tables": {name: json.loads(frame.to_json(orient="records", force_ascii=False))
+                   for name, frame in tables},
+    }
+    return page, json.dumps(payload, ensure_ascii=False)
+
+
+def render_index(entries: Dict[str, Dict[str, Any]]) -> str:
+    body = ["<h1>圣经历史研读 · 静态导出</h1>"]
+    pages: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+    for rel, entry in entries.items():
+        pages.setdefault(entry["page"], []).append((rel, entry))
+    for page in [p for p in PAGES if p in pages] + [p for p in pages if p not in PAGES]:
+        items = pages[page]
+        body.append(f"<h2>{html.escape(items[0][1]['title'])}</h2><ul>")
+        for rel, entry in items:
+            body.append(f'<li><a href="{rel}.html">{html.escape(entry["label"])}</a> '
+                        f'（<a href="{rel}.json">JSON</a>）</li>')
+        body.append("</ul>")
+    return _TEMPLATE.format(title="静态导出", body="\n".join(body))
+
+
+def export(pages: List[str], out_dir: pathlib.Path = OUT_DIR, force: bool = False) -> Dict[str, int]:
+    """导出指定页面，返回 {built, skipped, removed}"""
+    manifest_path = out_dir / "manifest.json"
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifest = {}
+    old = manifest.get("artifacts", {})
+    entries = {rel: entry for rel, entry in old.items() if entry["page"] not in pages}
+    counts = {"built": 0, "skipped": 0, "removed": 0}
+
+    for page in pages:
+        for artifact in PAGES[page]():
+            rel = f"{artifact.page}/{artifact.slug}"
+            key = artifact.key
+            if (not force and old.get(rel, {}).get("key") == key
+                    and (out_dir / f"{rel}.html").exists() and (out_dir / f"{rel}.json").exists()):
+                counts["skipped"] += 1
+            else:
+                page_html, page_json = render_page(artifact, *artifact.render())
+                _write(out_dir / f"{rel}.html", page_html)
+                _write(out_dir / f"{rel}.json", page_json)
+                counts["built"] += 1
+                print(f"{artifact.page}：{artifact.label}")
+            entries[rel] = {"key": key, "page": artifact.page, "title": artifact.title,
+                            "label": artifact.label}
+
+    for rel, entry in old.items():
+        if rel not in entries:
+            for suffix in (".html", ".json"):
+                (out_dir / f"{rel}{suffix}").unlink(missing_ok=True)
+            counts["removed"] += 1
+
+    _write(out_dir / "index.html", render_index(entries))
+    manifest = {"format": EXPORT_VERSION, "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "artifacts": entries}
+    _write(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="把各子应用预先渲染为静态 HTML / JSON")
+    parser.add_argument("pages", nargs="*", help=f"默认全部：{' '.join(PAGES)}")
+    parser.add_argument("--out", type=pathlib.Path, default=OUT_DIR, help="输出目录（默认 dist/）")
+    parser.add_argument("--force", action="store_true", help="忽略清单，全部重新渲染")
+    args = parser.parse_args()
+    pages = args.pages or list(PAGES)
+    unknown = [page for page in pages if page not in PAGES]
+    if unknown:
+        parser.error(f"未知页面：{', '.join(unknown)}")
+
+    start = time.perf_counter()
+    counts = export(pages, args.out, force=args.force)
+    print(f"渲染 {counts['built']}，未变化 {counts['skipped']}，删除 {counts['removed']}，"
+          f"耗时 {time.perf_counter() - start:.1f}s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
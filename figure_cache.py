@@ -0,0 +1,114 @@
+# figure_cache.py ───────────────────────────────────────────
+"""已渲染图表缓存
+
+图表以 JSON 形式存放在有界 LRU 中，键由数据集版本与规范化后的控件状态
+（多选项排序等）组成；可选的磁盘层（环境变量 BIBLE_STUDY_FIGURE_CACHE_DIR）
+在进程重启 / 内存淘汰后继续命中。命中 / 未命中计数见 stats()。
+"""
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import instrument
+
+MAX_ENTRIES = 256
+DISK_DIR = os.environ.get("BIBLE_STUDY_FIGURE_CACHE_DIR")
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, str]" = OrderedDict()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"图表": dict(_memory)}
+
+
+def _normalize(value: Any) -> Any:
+    """控件状态规范化：字典按键排序，集合排序（多选项传 set，与选择顺序无关），列表保持顺序"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=lambda v: json.dumps(v, ensure_ascii=False, default=str))
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, "tolist"):
+        return _normalize(value.tolist())
+    return value
+
+
+def make_key(namespace: str, versions: Dict[str, str], state: Dict[str, Any]) -> str:
+    """namespace + 数据版本 + 控件状态 → 缓存键"""
+    payload = json.dumps([namespace, _normalize(versions), _normalize(state)],
+                         ensure_ascii=False, default=str)
+    return f"{namespace}-{hashlib.sha1(payload.encode()).hexdigest()[:20]}"
+
+
+def _disk_path(key: str) -> Optional[pathlib.Path]:
+    if not DISK_DIR:
+        return None
+    return pathlib.Path(DISK_DIR) / f"{key}.json"
+
+
+def _remember(key: str, fig_json: str) -> None:
+    with _lock:
+        _memory[key] = fig_json
+        _memory.move_to_end(key)
+        while len(_memory) > MAX_ENTRIES:
+            _memory.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def get_or_build(namespace: str, versions: Dict[str, str], state: Dict[str, Any],
+                 build: Callable[[], go.Figure]) -> go.Figure:
+    """命中则从缓存的 JSON 还原图表，否则调用 build() 并写入缓存"""
+    key = make_key(namespace, versions, state)
+    with _lock:
+        fig_json = _memory.get(key)
+        if fig_json is not None:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+    if fig_json is None:
+        path = _disk_path(key)
+        if path is not None and path.exists():
+            fig_json = path.read_text()
+            _remember(key, fig_json)
+            with _lock:
+                _stats["disk_hits"] += 1
+    if fig_json is not None:
+        with instrument.span("figure_restore"):
+            return pio.from_json(fig_json, skip_invalid=True)
+
+    with instrument.span(f"figure:{namespace}"):
+        fig = build()
+    fig_json = fig.to_json()
+    _remember(key, fig_json)
+    with _lock:
+        _stats["misses"] += 1
+    path = _disk_path(key)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(fig_json)
+        os.replace(tmp, path)
+    return fig
+
+
+def stats() -> Dict[str, int]:
+    """命中 / 未命中 / 淘汰计数及当前条目数"""
+    with _lock:
+        return {**_stats, "entries": len(_memory),
+                "bytes": sum(len(v) for v in _memory.values())}
+
+
+def clear() -> None:
+    with _lock:
+        _memory.clear()
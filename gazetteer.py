@@ -0,0 +1,276 @@
+# gazetteer.py ──────────────────────────────────────────────
+"""本地地名库
+
+地名的来源有三个。地名库在进程内共享，任一来源文件变化后重建：
+· routes 数据集中已校对的地点坐标（中文名 + 英文名）；
+· database/ 下各 GeoJSON 中带 name 的要素（区域取质心，河流取中点，地名标注取点位）；
+· database/gazetteer/*.csv 导入的地名表，列为 名称(中文)、名称(英文)、纬度、经度、
+  别名、地区（均可选，多个以 `;` 或 `、` 分隔）。导入表优先级最高，可修正其他来源。
+
+查询时先按规范化后的名称精确匹配（字典查找），再用字符三元组取候选、
+按编辑距离打分做模糊匹配。带限定词的英文查询（如 `Boston, MA`）只有在限定词都
+属于地点的“地区”时才接受：同名异地（`Athens, GA`、`Salem, OR`）视为未找到，
+交给坐标缓存与在线 Geocoding。
+
+    python gazetteer.py 耶路撒冷 "Philadelpia, PA"     # 查看匹配结果
+"""
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import data_store
+import geo_index
+import instrument
+
+IMPORT_DIR = data_store.DB / "gazetteer"
+
+MIN_SIMILARITY = 0.8    # 模糊匹配的最低相似度（1 - 编辑距离 / 较长名称的长度）
+MAX_CANDIDATES = 20     # 三元组重合最多的候选才计算编辑距离
+SKIP_KINDS = {"land"}   # 不作为地名的 GeoJSON 要素
+
+_SEPARATORS = re.compile(r"[\s\-‐–—_'’.,，、()（）·]+")
+_ALIASES = re.compile(r"[;；、]")
+
+
+@dataclass(frozen=True)
+class Place:
+    name_cn: str
+    name_en: str
+    lat: float
+    lon: float
+    source: str
+    regions: Tuple[str, ...] = ()       # 规范化的地区名（州 / 国家及其缩写），用于核对查询中的限定词
+
+
+@dataclass(frozen=True)
+class Match:
+    place: Place
+    query: str
+    score: float        # 1.0 为精确匹配
+
+    @property
+    def coord(self) -> Dict[str, float]:
+        return {"lat": self.place.lat, "lon": self.place.lon}
+
+
+def normalize(name: str) -> str:
+    """全角转半角、去变音符号、小写，标点与空白统一为单个空格"""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def trigrams(key: str) -> List[str]:
+    padded = f"$${key}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def split_qualifiers(name: str) -> Tuple[str, Tuple[str, ...]]:
+    """`Boston, MA, USA` -> ('boston', ('ma', 'usa'))"""
+    head, *rest = str(name).split(",")
+    return normalize(head), tuple(q for q in map(normalize, rest) if q)
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Levenshtein 距离；超过 limit 时提前返回 limit + 1"""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if limit is not None and min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class Gazetteer:
+    def __init__(self):
+        self.places: List[Place] = []
+        self.exact: Dict[str, int] = {}                         # 规范化名称 -> 地点下标
+        self.grams: Dict[str, List[str]] = defaultdict(list)    # 三元组 -> 规范化名称
+        self._fuzzy_memo: Dict[str, Optional[Tuple[str, float]]] = {}
+
+    def add(self, place: Place, aliases: Iterable[str] = ()) -> None:
+        """先加入的地点优先；同名地点只保留第一个"""
+        idx = len(self.places)
+        self.places.append(place)
+        for name in (place.name_cn, place.name_en, *aliases):
+            key = normalize(name) if name else ""
+            if not key or key in self.exact:
+                continue
+            self.exact[key] = idx
+            for gram in set(trigrams(key)):
+                self.grams[gram].append(key)
+
+    def finish(self) -> "Gazetteer":
+        self.grams = dict(self.grams)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _fuzzy(self, key: str) -> Optional[Tuple[str, float]]:
+        if key in self._fuzzy_memo:
+            return self._fuzzy_memo[key]
+        shared = Counter(k for gram in set(trigrams(key)) for k in self.grams.get(gram, ()))
+        best: Optional[Tuple[str, float]] = None
+        for cand, _ in shared.most_common(MAX_CANDIDATES):
+            longest = max(len(cand), len(key))
+            limit = int(longest * (1 - MIN_SIMILARITY) + 1e-9)
+            dist = edit_distance(key, cand, limit)
+            if dist > limit:
+                continue
+            score = 1 - dist / longest
+            if best is None or score > best[1]:
+                best = (cand, score)
+        self._fuzzy_memo[key] = best
+        return best
+
+    def lookup(self, *names: str) -> Optional[Match]:
+        """依次尝试各个名称（如英文名、中文名），返回第一个命中；均未命中返回 None
+
+        名称带逗号限定词时，除与整个名称（别名）精确相同外，命中的地点的地区
+        必须包含全部限定词。
+        """
+        queries = []        # (原始名称, 规范化名称, 逗号前部分, 限定词)
+        for name in names:
+            if name is None or pd.isna(name):
+                continue
+            head, qualifiers = split_qualifiers(name)
+            queries.append((name, normalize(name), head, qualifiers))
+
+        def agrees(place: Place, qualifiers: Tuple[str, ...]) -> bool:
+            return all(q in place.regions for q in qualifiers)
+
+        for name, key, head, qualifiers in queries:
+            if key in self.exact:
+                return Match(self.places[self.exact[key]], name, 1.0)
+            if qualifiers and head in self.exact and agrees(self.places[self.exact[head]], qualifiers):
+                return Match(self.places[self.exact[head]], name, 1.0)
+        for name, key, head, qualifiers in queries:
+            for candidate in ((key, head) if qualifiers else (key,)):
+                found = self._fuzzy(candidate) if candidate else None
+                if found is None:
+                    continue
+                place = self.places[self.exact[found[0]]]
+                if agrees(place, qualifiers):
+                    return Match(place, name, found[1])
+        return None
+
+
+# ───── 来源 ─────────────────────────────────────────────────
+def _import_files() -> List:
+    return sorted(IMPORT_DIR.glob("*.csv")) if IMPORT_DIR.exists() else []
+
+
+def _add_imports(gaz: Gazetteer) -> None:
+    for path in _import_files():
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+        lat = pd.to_numeric(frame["纬度"], errors="coerce")
+        lon = pd.to_numeric(frame["经度"], errors="coerce")
+        empty = pd.Series("", index=frame.index)
+        aliases = frame["别名"] if "别名" in frame.columns else empty
+        regions = frame["地区"] if "地区" in frame.columns else empty
+        for cn, en, y, x, alias, region in zip(frame["名称(中文)"], frame["名称(英文)"], lat, lon,
+                                               aliases, regions):
+            if pd.isna(y) or pd.isna(x):
+                continue
+            names = [a.strip() for a in _ALIASES.split(alias) if a.strip()]
+            areas = tuple(normalize(r) for r in _ALIASES.split(region) if r.strip())
+            gaz.add(Place(cn.strip(), en.strip(), float(y), float(x), path.name, areas), names)
+
+
+def _add_routes(gaz: Gazetteer) -> None:
+    routes = data_store.load("routes").dropna(subset=["latitude", "longitude"])
+    routes = routes.drop_duplicates("地点名称")
+    for cn, en, y, x in zip(routes["地点名称"], routes["地点名称(英文)"],
+                            routes["latitude"], routes["longitude"]):
+        gaz.add(Place(cn, en if isinstance(en, str) else "", float(y), float(x), "routes"))
+
+
+def _feature_point(feature: Dict) -> Optional[Tuple[float, float]]:
+    geom = feature["geometry"]
+    if geom["type"] == "Point":
+        lon, lat = geom["coordinates"][:2]
+        return lat, lon
+    if geom["type"] == "LineString":
+        lon, lat = geom["coordinates"][len(geom["coordinates"]) // 2][:2]
+        return lat, lon
+    center = geo_index.compute_anchors({"features": [dict(feature, id=0)]}).get(0)
+    return (center["label_lat"], center["label_lon"]) if center else None
+
+
+def _add_geojson(gaz: Gazetteer) -> None:
+    for path in sorted(data_store.DB.glob("*.geojson")):
+        for feature in geo_index.load_geo(path)["features"]:
+            props = feature.get("properties") or {}
+            if not props.get("name") or props.get("kind") in SKIP_KINDS:
+                continue
+            point = _feature_point(feature)
+            if point is None:
+                continue
+            name = props["name"]
+            # 中文名放 name_cn，纯 ASCII 名称（如州名）放 name_en
+            cn, en = ("", name) if str(name).isascii() else (name, "")
+            aliases = [feature["id"]] if isinstance(feature.get("id"), str) else []
+            gaz.add(Place(cn, en, float(point[0]), float(point[1]), path.name), aliases)
+
+
+def build() -> Gazetteer:
+    gaz = Gazetteer()
+    _add_imports(gaz)
+    _add_routes(gaz)
+    _add_geojson(gaz)
+    return gaz.finish()
+
+
+_lock = threading.Lock()
+_gazetteers: Dict[Tuple[str, ...], Gazetteer] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"地名库": dict(_gazetteers)}
+
+
+def _version() -> Tuple[str, ...]:
+    files = _import_files()
+    return (data_store.version("routes"),
+            *(geo_index.geo_version(p) for p in sorted(data_store.DB.glob("*.geojson"))),
+            *(f"{p.name}:{data_store.file_hash(p)}" for p in files))
+
+
+def get() -> Gazetteer:
+    """按各来源版本缓存的地名库，来源更新后重建"""
+    key = _version()
+    with _lock:
+        if key not in _gazetteers:
+            with instrument.span("gazetteer_build"):
+                _gazetteers.clear()
+                _gazetteers[key] = build()
+        return _gazetteers[key]
+
+
+if __name__ == "__main__":
+    gaz = get()
+    print(f"地名库：{len(gaz)} 个地点")
+    for query in sys.argv[1:]:
+        match = gaz.lookup(query)
+        if match is None:
+            print(f"{query}：未找到")
+        else:
+            p = match.place
+            print(f"{query} -> {p.name_cn or p.name_en} {p.name_en} "
+                  f"({p.lat:.4f}, {p.lon:.4f}) 相似度 {match.score:.2f} 来源 {p.source}")
@@ -0,0 +1,185 @@
+# geo_index.py ──────────────────────────────────────────────
+"""GeoJSON 几何索引
+
+· GeoJSON 按文件内容哈希在进程内只加载一次；
+· 各要素的面积加权质心与标签锚点（最大分块的质心）用 NumPy 一次性算出，
+  并以 <文件名>.anchors.json 持久化在原文件旁，哈希不变时直接读取。
+"""
+import json
+import os
+import pathlib
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+import data_store
+
+_lock = threading.Lock()
+_geo_cache: Dict[pathlib.Path, Tuple[Tuple[int, int], str, Dict[str, Any]]] = {}
+_anchor_cache: Dict[Tuple[pathlib.Path, str], Dict[str, Dict[str, float]]] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {
+            "GeoJSON": {path: geo for path, (_, _, geo) in _geo_cache.items()},
+            "质心锚点": dict(_anchor_cache),
+        }
+
+
+def _stamp(path: pathlib.Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load(path: pathlib.Path) -> Tuple[str, Dict[str, Any]]:
+    path = pathlib.Path(path).resolve()
+    stamp = _stamp(path)
+    with _lock:
+        cached = _geo_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1], cached[2]
+        digest = data_store.file_hash(path)
+        if cached is not None and cached[1] == digest:
+            geo = cached[2]
+        else:
+            geo = json.loads(path.read_text())
+        _geo_cache[path] = (stamp, digest, geo)
+        return digest, geo
+
+
+def load_geo(path: pathlib.Path) -> Dict[str, Any]:
+    """读取 GeoJSON（进程内共享，只读）"""
+    return _load(path)[1]
+
+
+def geo_version(path: pathlib.Path) -> str:
+    """GeoJSON 文件的内容哈希"""
+    return _load(path)[0]
+
+
+def _polygons(geom: Dict[str, Any]) -> List[List[List[List[float]]]]:
+    if geom["type"] == "Polygon":
+        return [geom["coordinates"]]
+    if geom["type"] == "MultiPolygon":
+        return geom["coordinates"]
+    return []
+
+
+def compute_anchors(geo: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """要素 id -> {lat, lon: 面积加权质心; label_lat, label_lon: 最大分块质心}
+
+    所有环拼成一个顶点数组，鞋带公式的各项按环用 reduceat 求和；
+    内环（洞）面积取负。平面经纬度近似，对州级区域足够。
+    """
+    coords, starts = [], []
+    ring_feat, ring_poly, ring_sign = [], [], []
+    ids = []
+    n = 0
+    poly_id = 0
+    for feat in geo["features"]:
+        fid = len(ids)
+        ids.append(feat.get("id"))
+        for poly in _polygons(feat["geometry"]):
+            for k, ring in enumerate(poly):
+                ring = np.asarray(ring, dtype=float)[:, :2]
+                if len(ring) < 3:
+                    continue
+                coords.append(ring)
+                starts.append(n)
+                n += len(ring)
+                ring_feat.append(fid)
+                ring_poly.append(poly_id)
+                ring_sign.append(1.0 if k == 0 else -1.0)
+            poly_id += 1
+    if not coords:
+        return {}
+
+    xy = np.concatenate(coords)
+    starts = np.asarray(starts)
+    lengths = np.diff(np.append(starts, n))
+    ring_of = np.repeat(np.arange(len(starts)), lengths)
+    nxt = np.arange(n) + 1
+    nxt[starts + lengths - 1] = starts            # 每个环的末点连回起点
+    x, y = xy[:, 0], xy[:, 1]
+    x1, y1 = x[nxt], y[nxt]
+    cross = x * y1 - x1 * y
+
+    ring_a = np.add.reduceat(cross, starts) / 2
+    ring_cx = np.add.reduceat((x + x1) * cross, starts)
+    ring_cy = np.add.reduceat((y + y1) * cross, starts)
+    # 环的方向不定：取面积绝对值，按内外环符号加减
+    orient = np.sign(ring_a)
+    orient[orient == 0] = 1
+    area = np.abs(ring_a) * np.asarray(ring_sign)
+    mx = ring_cx * orient / 6 * np.asarray(ring_sign)        # = 面积 × 质心 x
+    my = ring_cy * orient / 6 * np.asarray(ring_sign)
+    # 退化环（面积为 0）时回退到顶点均值
+    mean_x = np.bincount(ring_of, weights=x, minlength=len(starts)) / lengths
+    mean_y = np.bincount(ring_of, weights=y, minlength=len(starts)) / lengths
+
+    ring_feat = np.asarray(ring_feat)
+    ring_poly = np.asarray(ring_poly)
+    n_feat, n_poly = len(ids), poly_id
+    feat_a = np.bincount(ring_feat, weights=area, minlength=n_feat)
+    feat_mx = np.bincount(ring_feat, weights=mx, minlength=n_feat)
+    feat_my = np.bincount(ring_feat, weights=my, minlength=n_feat)
+    poly_a = np.bincount(ring_poly, weights=area, minlength=n_poly)
+    poly_mx = np.bincount(ring_poly, weights=mx, minlength=n_poly)
+    poly_my = np.bincount(ring_poly, weights=my, minlength=n_poly)
+
+    # 每个要素面积最大的分块
+    poly_feat = np.full(n_poly, -1)
+    poly_feat[ring_poly] = ring_feat
+    order = np.lexsort((-poly_a, poly_feat))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = poly_feat[order][1:] != poly_feat[order][:-1]
+    biggest = dict(zip(poly_feat[order][first].tolist(), order[first].tolist()))
+    first_ring = dict(zip(ring_feat[::-1].tolist(), np.arange(len(ring_feat))[::-1].tolist()))
+
+    anchors = {}
+    for fid, sid in enumerate(ids):
+        if fid not in first_ring:
+            continue
+        if feat_a[fid] > 0:
+            lon, lat = feat_mx[fid] / feat_a[fid], feat_my[fid] / feat_a[fid]
+        else:
+            r = first_ring[fid]
+            lon, lat = mean_x[r], mean_y[r]
+        p = biggest.get(fid)
+        if p is not None and poly_a[p] > 0:
+            label_lon, label_lat = poly_mx[p] / poly_a[p], poly_my[p] / poly_a[p]
+        else:
+            label_lon, label_lat = lon, lat
+        anchors[sid] = {"lat": float(lat), "lon": float(lon),
+                        "label_lat": float(label_lat), "label_lon": float(label_lon)}
+    return anchors
+
+
+def anchors(path: pathlib.Path) -> Dict[str, Dict[str, float]]:
+    """要素锚点索引：进程内缓存 → 旁路文件 → 重新计算并写回"""
+    path = pathlib.Path(path).resolve()
+    digest, geo = _load(path)
+    key = (path, digest)
+    with _lock:
+        if key in _anchor_cache:
+            return _anchor_cache[key]
+    sidecar = path.with_name(path.name + ".anchors.json")
+    result = None
+    if sidecar.exists():
+        try:
+            stored = json.loads(sidecar.read_text())
+            if stored.get("hash") == digest:
+                result = stored["anchors"]
+        except (ValueError, KeyError):
+            result = None
+    if result is None:
+        result = compute_anchors(geo)
+        tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"hash": digest, "anchors": result}, ensure_ascii=False))
+        os.replace(tmp, sidecar)
+    with _lock:
+        _anchor_cache[key] = result
+    return result
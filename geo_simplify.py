@@ -0,0 +1,160 @@
+# geo_simplify.py ───────────────────────────────────────────
+"""按缩放级别简化 GeoJSON，缩小地图负载
+
+· 每个 GeoJSON 按若干容差预先生成简化版本（进程内缓存，按文件哈希失效）；
+· 简化保持拓扑：相邻区域共享边界上的“节点”（三个及以上区域交汇点、
+  共享 / 非共享边界的交界点）固定不动，节点之间的链用 Douglas-Peucker
+  简化，共享边界两侧得到相同结果，不会出现缝隙或重叠；
+· 只下发当前视图引用到的要素。
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+import geo_index
+
+# (最小缩放级别, 容差（度）)：缩放越大越精细，0 表示原始几何
+ZOOM_TOLERANCES: List[Tuple[float, float]] = [
+    (0, 0.1),
+    (3, 0.03),
+    (5, 0.01),
+    (7, 0.002),
+    (9, 0.0),
+]
+
+_lock = threading.Lock()
+_variants: Dict[Tuple[str, str, float], Dict[str, Any]] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"简化几何": dict(_variants)}
+
+
+def tolerance_for_zoom(zoom: float) -> float:
+    """缩放级别对应的简化容差"""
+    tolerance = ZOOM_TOLERANCES[0][1]
+    for min_zoom, tol in ZOOM_TOLERANCES:
+        if zoom >= min_zoom:
+            tolerance = tol
+    return tolerance
+
+
+def _douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """返回保留点的布尔掩码（首尾必定保留）"""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        seg = points[i + 1:j]
+        a, b = points[i], points[j]
+        d = b - a
+        norm = np.hypot(d[0], d[1])
+        if norm == 0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(d[0] * (seg[:, 1] - a[1]) - d[1] * (seg[:, 0] - a[0])) / norm
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return keep
+
+
+def _rings(geo: Dict[str, Any]) -> Iterable[Tuple[int, List[List[float]]]]:
+    for fid, feat in enumerate(geo["features"]):
+        geom = feat["geometry"]
+        polys = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        for poly in polys:
+            for ring in poly:
+                yield fid, ring
+
+
+def _shared_counts(geo: Dict[str, Any]) -> Dict[Tuple[float, float], int]:
+    """每个顶点被多少个不同要素使用"""
+    xy, owner = [], []
+    for fid, ring in _rings(geo):
+        xy.append(np.asarray(ring, dtype=float)[:, :2])
+        owner.append(np.full(len(ring), fid))
+    if not xy:
+        return {}
+    keys = np.round(np.concatenate(xy) * 1e7).astype(np.int64)
+    owner = np.concatenate(owner)
+    pairs = np.unique(np.column_stack([keys, owner]), axis=0)
+    uniq, counts = np.unique(pairs[:, :2], axis=0, return_counts=True)
+    shared = counts > 1
+    return {tuple(k): int(c) for k, c in zip(uniq[shared].tolist(), counts[shared])}
+
+
+def _simplify_ring(ring: List[List[float]], shared: Dict[Tuple[float, float], int],
+                   tolerance: float) -> List[List[float]]:
+    pts = np.asarray(ring, dtype=float)[:, :2]
+    closed = len(pts) > 1 and np.array_equal(pts[0], pts[-1])
+    body = pts[:-1] if closed else pts
+    n = len(body)
+    if n < 4:
+        return ring
+    keys = np.round(body * 1e7).astype(np.int64).tolist()
+    count = np.array([shared.get(tuple(k), 1) for k in keys])
+    # 节点：三区以上交汇，或共享状态在此变化
+    node = (count >= 3) | (count != np.roll(count, 1)) | (count != np.roll(count, -1))
+    if not node.any():
+        far = int(np.argmax(np.hypot(*(body - body[0]).T)))
+        node[[0, far]] = True
+    idx = np.flatnonzero(node)
+    # 从第一个节点起旋转环，使每条链都落在两个节点之间
+    order = np.roll(np.arange(n), -idx[0])
+    rotated = body[order]
+    anchors = np.append(np.flatnonzero(node[order]), n)
+    keep = np.zeros(n + 1, dtype=bool)
+    loop = np.vstack([rotated, rotated[:1]])
+    for i, j in zip(anchors[:-1], anchors[1:]):
+        keep[i:j + 1] |= _douglas_peucker(loop[i:j + 1], tolerance)
+    out = loop[keep]
+    if len(out) < 4:
+        return ring
+    return out.tolist()
+
+
+def _simplify(geo: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    shared = _shared_counts(geo)
+    features = []
+    for feat in geo["features"]:
+        geom = feat["geometry"]
+        if geom["type"] == "Polygon":
+            coords = [_simplify_ring(r, shared, tolerance) for r in geom["coordinates"]]
+        elif geom["type"] == "MultiPolygon":
+            coords = [[_simplify_ring(r, shared, tolerance) for r in poly]
+                      for poly in geom["coordinates"]]
+        else:
+            features.append(feat)
+            continue
+        features.append({**feat, "geometry": {"type": geom["type"], "coordinates": coords}})
+    return {**geo, "features": features}
+
+
+def simplified(path, tolerance: float) -> Dict[str, Any]:
+    """指定容差的简化版本（按文件哈希缓存）"""
+    digest = geo_index.geo_version(path)
+    geo = geo_index.load_geo(path)
+    if tolerance <= 0:
+        return geo
+    key = (str(path), digest, tolerance)
+    with _lock:
+        if key not in _variants:
+            _variants[key] = _simplify(geo, tolerance)
+        return _variants[key]
+
+
+def view_geo(path, ids: Iterable[str], zoom: float) -> Dict[str, Any]:
+    """当前视图所需的 GeoJSON：按缩放级别选取简化版本，只保留 ids 中的要素"""
+    geo = simplified(path, tolerance_for_zoom(zoom))
+    wanted = set(ids)
+    return {**geo, "features": [f for f in geo["features"] if f.get("id") in wanted]}
@@ -0,0 +1,294 @@
+# geocoding.py ──────────────────────────────────────────────
+"""城市坐标解析（Mapbox Geocoding）
+
+· 未命中缓存的查询由有界线程池并发解析，令牌桶限速，失败按指数退避重试；
+· 相同查询文本只发一次请求：同一批内去重，并发的其他会话正在解析的文本直接等待其结果；
+· 限速与 Geocoder 实例都是进程级的（get_geocoder），多个会话共用同一个令牌桶；
+· 结果写入持久化缓存（带 TTL，查无结果也会缓存一段时间），
+  只有条目变化时才回写文件；多个进程共用同一缓存文件时，回写在文件锁内
+  先读入磁盘上的最新内容再合并本进程的新条目，不会互相覆盖；
+· HTTP 后端可替换，便于对接本地的模拟服务做测试；
+· 未提供令牌（离线底图模式）时只查缓存，不发请求；
+· 提供地名库（gazetteer）时先在本地解析，命中的查询不读写缓存、不发请求。
+"""
+import json
+import os
+import pathlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import instrument
+import shared_cache
+
+MAPBOX_URL = "https://api.mapbox.com/geocoding/v5/mapbox.places"
+
+# 正常结果 30 天过期，查无结果 1 天后重试
+TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+
+Coord = Dict[str, float]
+Backend = Callable[[str, Dict[str, Any], float], Dict[str, Any]]
+
+
+class PermanentError(Exception):
+    """不应重试的错误（如 4xx：Token 无效、请求格式错误）"""
+
+
+def requests_backend(url: str, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """默认 HTTP 后端：requests.get → JSON"""
+    import requests
+    res = requests.get(url, params=params, timeout=timeout)
+    if 400 <= res.status_code < 500 and res.status_code != 429:
+        raise PermanentError(f"HTTP {res.status_code}")
+    res.raise_for_status()
+    return res.json()
+
+
+# ───── 令牌桶限速 ─────────────────────────────────────────────
+class TokenBucket:
+    """每秒补充 rate 个令牌，最多积累 capacity 个"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: Dict[Tuple[str, float], TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def shared_bucket(base_url: str, rate: float) -> TokenBucket:
+    """同一服务地址在进程内共用的令牌桶"""
+    with _buckets_lock:
+        if (base_url, rate) not in _buckets:
+            _buckets[(base_url, rate)] = TokenBucket(rate)
+        return _buckets[(base_url, rate)]
+
+
+# ───── 持久化缓存 ─────────────────────────────────────────────
+class GeocodeCache:
+    """代码 -> {"lat", "lon", "ts"} 或 {"miss": true, "ts"}
+
+    旧格式（无 ts）的条目视为永不过期。同一代码在合并时以 ts 较新的为准。
+    """
+
+    def __init__(self, path: pathlib.Path, ttl: float = TTL, negative_ttl: float = NEGATIVE_TTL):
+        self.path = pathlib.Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._changed: Dict[str, Dict[str, Any]] = {}    # 尚未写回的条目
+        self._mtime: Optional[int] = None
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        return json.loads(self.path.read_text()) if self.path.exists() else {}
+
+    def _reload(self) -> None:
+        # 文件被外部（其他进程）修改时重新读取，保留本进程未写回的条目
+        mtime = self.path.stat().st_mtime_ns if self.path.exists() else None
+        if mtime != self._mtime:
+            self._entries = {**self._read(), **self._changed}
+            self._mtime = mtime
+
+    def lookup(self, code: str) -> Tuple[bool, Optional[Coord]]:
+        """(是否命中, 坐标)；命中但坐标为 None 表示缓存的“查无结果”"""
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(code)
+        if entry is None:
+            return False, None
+        ts = entry.get("ts")
+        if entry.get("miss"):
+            if ts is not None and time.time() - ts > self.negative_ttl:
+                return False, None
+            return True, None
+        if ts is not None and time.time() - ts > self.ttl:
+            return False, None
+        return True, {"lat": entry["lat"], "lon": entry["lon"]}
+
+    def store(self, code: str, coord: Optional[Coord]) -> None:
+        entry = {"miss": True} if coord is None else {"lat": coord["lat"], "lon": coord["lon"]}
+        entry["ts"] = int(time.time())
+        with self._lock:
+            self._entries[code] = entry
+            self._changed[code] = entry
+
+    def save(self) -> bool:
+        """有变化时在文件锁内合并磁盘上的最新内容并原子写回，返回是否写入"""
+        with self._lock:
+            if not self._changed:
+                return False
+            with shared_cache.file_lock(self.lock_path):
+                merged = self._read()
+                for code, entry in self._changed.items():
+                    current = merged.get(code)
+                    if current is None or current.get("ts", 0) <= entry["ts"]:
+                        merged[code] = entry
+                tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(merged, ensure_ascii=False, indent=2))
+                os.replace(tmp, self.path)
+                self._mtime = self.path.stat().st_mtime_ns
+            self._entries = merged
+            self._changed = {}
+            return True
+
+
+# ───── 并发解析 ───────────────────────────────────────────────
+class Geocoder:
+    def __init__(
+        self,
+        token: str,
+        cache: GeocodeCache,
+        backend: Backend = requests_backend,
+        base_url: str = MAPBOX_URL,
+        max_workers: int = 4,
+        rate: float = 5.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10.0,
+        gazetteer=None,
+    ):
+        self.token = token
+        self.cache = cache
+        self.backend = backend
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.bucket = shared_bucket(self.base_url, rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.gazetteer = gazetteer
+        self._inflight: Dict[str, Future] = {}      # 查询文本 -> 正在进行的请求
+        self._inflight_lock = threading.RLock()     # 已完成的请求在 add_done_callback 中同步回调
+
+    def _fetch(self, text: str) -> Optional[Coord]:
+        """解析单个查询；查无结果返回 None，重试耗尽则抛出最后一次异常"""
+        url = f"{self.base_url}/{quote(text, safe='')}.json"
+        params = {"limit": 1, "access_token": self.token}
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                res = self.backend(url, params, self.timeout)
+                break
+            except PermanentError:
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+        features = res.get("features") or []
+        if not features:
+            return None
+        lon, lat = features[0]["center"]
+        return {"lat": lat, "lon": lon}
+
+    @instrument.timed("geocode")
+    def resolve(self, queries: Dict[str, str]) -> Tuple[Dict[str, Optional[Coord]], Dict[str, str]]:
+        """queries: 代码 -> 查询文本
+
+        返回 (代码 -> 坐标或 None, 代码 -> 错误信息)；出错的代码不写入缓存。
+        """
+        results: Dict[str, Optional[Coord]] = {}
+        pending: Dict[str, list] = {}            # 查询文本 -> 代码列表（去重）
+        for code, text in queries.items():
+            if self.gazetteer is not None:
+                match = self.gazetteer.lookup(text)
+                if match is not None:
+                    results[code] = match.coord
+                    continue
+            hit, coord = self.cache.lookup(code)
+            if hit:
+                results[code] = coord
+            else:
+                pending.setdefault(text.strip(), []).append(code)
+
+        errors: Dict[str, str] = {}
+        if pending and not self.token:
+            # 离线模式：只使用缓存
+            for codes in pending.values():
+                for code in codes:
+                    errors[code] = "未提供访问令牌，缓存中无此城市坐标"
+            return results, errors
+        if pending:
+            workers = min(self.max_workers, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures: Dict[str, Future] = {}
+                with self._inflight_lock:
+                    for text in pending:
+                        if text not in self._inflight:
+                            future = pool.submit(self._fetch, text)
+                            self._inflight[text] = future
+                            future.add_done_callback(lambda _, text=text: self._done(text))
+                        futures[text] = self._inflight[text]
+            for text, future in futures.items():
+                try:
+                    coord = future.result()
+                except Exception as e:
+                    for code in pending[text]:
+                        errors[code] = str(e)
+                    continue
+                for code in pending[text]:
+                    results[code] = coord
+                    self.cache.store(code, coord)
+            self.cache.save()
+        return results, errors
+
+
+    def _done(self, text: str) -> None:
+        with self._inflight_lock:
+            self._inflight.pop(text, None)
+
+
+# 每个缓存文件在进程内只有一个实例，供所有会话共享
+_caches: Dict[pathlib.Path, GeocodeCache] = {}
+_caches_lock = threading.Lock()
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _caches_lock:
+        return {"坐标缓存": dict(_caches)}
+
+
+def get_cache(path: pathlib.Path) -> GeocodeCache:
+    path = pathlib.Path(path).resolve()
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = GeocodeCache(path)
+        return _caches[path]
+
+
+_geocoders: Dict[Tuple[pathlib.Path, Optional[str]], Geocoder] = {}
+_geocoders_lock = threading.Lock()
+
+
+def get_geocoder(path: pathlib.Path, token: Optional[str] = None, gazetteer=None) -> Geocoder:
+    """缓存文件与令牌对应的进程级 Geocoder；gazetteer 每次更新为调用方传入的最新版本"""
+    cache = get_cache(path)
+    with _geocoders_lock:
+        key = (cache.path, token)
+        if key not in _geocoders:
+            _geocoders[key] = Geocoder(token, cache)
+        geocoder = _geocoders[key]
+        geocoder.gazetteer = gazetteer
+        return geocoder
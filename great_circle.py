@@ -0,0 +1,61 @@
+# great_circle.py ───────────────────────────────────────────
+"""大圆（球面最短路径）插值与距离
+
+所有计算都基于 numpy 数组，一次处理整条线路（或全部线路）的全部路段。
+"""
+from typing import Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def interpolate(lat, lon, points_per_leg: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """沿大圆连接相邻地点
+
+    每段取 points_per_leg 个点（含起点、不含终点），最后补上终点。
+    返回 (纬度, 经度, 路段序号)；路段序号为该点所在路段的起点下标，终点为 n-1。
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if len(lat) < 2:
+        return lat.copy(), lon.copy(), np.arange(len(lat))
+    points_per_leg = max(1, int(points_per_leg))
+
+    v = _unit_vectors(lat, lon)
+    a, b = v[:-1, None, :], v[1:, None, :]                        # (路段, 1, 3)
+    t = (np.arange(points_per_leg) / points_per_leg)[None, :, None]  # (1, 点, 1)
+    omega = np.arccos(np.clip(np.sum(a * b, axis=-1, keepdims=True), -1.0, 1.0))
+    sin_omega = np.sin(omega)
+    # 两点重合或极近时退化为线性插值
+    near = sin_omega < 1e-9
+    safe = np.where(near, 1.0, sin_omega)
+    wa = np.where(near, 1 - t, np.sin((1 - t) * omega) / safe)
+    wb = np.where(near, t, np.sin(t * omega) / safe)
+    p = (wa * a + wb * b).reshape(-1, 3)
+    p = np.vstack([p, v[-1]])
+
+    out_lat = np.degrees(np.arctan2(p[:, 2], np.hypot(p[:, 0], p[:, 1])))
+    out_lon = np.degrees(np.arctan2(p[:, 1], p[:, 0]))
+    legs = np.append(np.repeat(np.arange(len(lat) - 1), points_per_leg), len(lat) - 1)
+    return out_lat, out_lon, legs
+
+
+def haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """两组点之间的大圆距离（公里），任一端坐标缺失时为 NaN"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def decimate(count: int, limit: int) -> np.ndarray:
+    """从 count 个点中均匀取不超过 limit 个的下标（保留首尾）"""
+    if count <= limit:
+        return np.arange(count)
+    return np.unique(np.linspace(0, count - 1, max(2, limit)).round().astype(int))
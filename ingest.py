@@ -0,0 +1,107 @@
+# ingest.py ─────────────────────────────────────────────────
+"""离线数据编译
+
+把 database/ 下的原始 CSV / XLSX 按 data_store.SCHEMAS 校验、规范类型后
+写为未压缩的 Arrow（Feather v2）文件，应用启动后以内存映射方式读取。
+database/compiled/manifest.json 记录每个输出对应的源文件哈希与列定义摘要，
+任一不符即视为过期，data_store 自动退回解析原始文件。
+
+用法：
+    python ingest.py                 # 编译过期的数据集
+    python ingest.py kings routes    # 只编译指定数据集
+    python ingest.py --force         # 全部重新编译
+    python ingest.py --check         # 只检查，存在过期输出时以非零状态退出
+    python ingest.py --strict        # 有无法解析的值时不写出该数据集
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import data_store
+import shared_cache
+
+
+def compile_dataset(name: str, strict: bool = False) -> Dict[str, Any]:
+    """编译单个数据集，返回清单条目（附 problems）"""
+    source = data_store.path(name)
+    version = data_store.file_hash(source)
+    frame, problems = data_store.normalize(name, data_store.DATASETS[name][1](source))
+    entry = {
+        "source": source.name,
+        "source_hash": version,
+        "schema": data_store.schema_fingerprint(name),
+        "output": f"{name}.arrow",
+        "rows": len(frame),
+        "columns": {col: str(dtype) for col, dtype in frame.dtypes.items()},
+        "compiled_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "problems": problems,
+    }
+    if strict and problems:
+        return entry
+
+    shared_cache.write_arrow(data_store.compiled_dir() / entry["output"], frame)
+    return entry
+
+
+def write_manifest(manifest: Dict[str, Any]) -> None:
+    path = data_store.manifest_path()
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def stale(names: List[str]) -> List[str]:
+    """编译输出缺失或过期的数据集"""
+    return [name for name in names
+            if data_store.compiled_entry(name, data_store.file_hash(data_store.path(name))) is None]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="把原始数据表编译为 Arrow 文件")
+    parser.add_argument("datasets", nargs="*", help=f"默认全部：{' '.join(data_store.DATASETS)}")
+    parser.add_argument("--force", action="store_true", help="忽略清单，全部重新编译")
+    parser.add_argument("--check", action="store_true", help="只检查是否有过期输出")
+    parser.add_argument("--strict", action="store_true", help="有无法解析的值时不写出")
+    args = parser.parse_args()
+    if not shared_cache.available():
+        parser.error("需要安装 pyarrow")
+    names = args.datasets or list(data_store.DATASETS)
+    unknown = [name for name in names if name not in data_store.DATASETS]
+    if unknown:
+        parser.error(f"未知数据集：{', '.join(unknown)}")
+
+    if args.check:
+        outdated = stale(names)
+        for name in outdated:
+            print(f"过期：{name}")
+        return 1 if outdated else 0
+
+    manifest = data_store.read_manifest()
+    manifest["format"] = data_store.FORMAT_VERSION
+    datasets = manifest.setdefault("datasets", {})
+    failed, compiled = [], []
+    for name in (names if args.force else stale(names)):
+        try:
+            entry = compile_dataset(name, strict=args.strict)
+        except data_store.SchemaError as e:
+            print(f"{name}：{e}")
+            failed.append(name)
+            continue
+        for problem in entry["problems"]:
+            print(f"{name}：{problem}")
+        if args.strict and entry["problems"]:
+            failed.append(name)
+            continue
+        datasets[name] = entry
+        compiled.append(name)
+        print(f"{name}：{entry['rows']} 行 -> {entry['output']}")
+    if compiled:
+        write_manifest(manifest)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
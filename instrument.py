@@ -0,0 +1,144 @@
+# instrument.py ─────────────────────────────────────────────
+"""分阶段计时
+
+轻量的 span / 装饰器，记录各阶段（数据解析、查询、图表构建、坐标解析、
+plotly_chart 序列化等）的耗时：
+· 进程内为每个阶段保留最近 WINDOW 个样本，用于计算 p50 / p95；
+· main_app 用 rerun() 包住每次脚本运行，结束时把本次各阶段耗时及该会话的
+  rerun 序号追加写入 JSONL 日志（环境变量 BIBLE_STUDY_METRICS_LOG，
+  默认 logs/metrics.jsonl）；会话超过 SESSION_TTL 秒无 rerun 即从进程内记录中移除。
+rerun() 之外的 span（如命令行脚本）只计入进程内样本，不写日志。
+本模块不依赖 streamlit，面板见 metrics_panel。
+"""
+import functools
+import json
+import os
+import pathlib
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterator, Optional
+
+if TYPE_CHECKING:       # numpy / pandas 只在统计时导入，登录页不加载
+    import pandas as pd
+
+LOG_PATH = pathlib.Path(os.environ.get("BIBLE_STUDY_METRICS_LOG")
+                        or pathlib.Path(__file__).resolve().parent / "logs" / "metrics.jsonl")
+WINDOW = 500            # 每个阶段保留的样本数
+SESSION_TTL = 3600      # 会话超过此秒数无 rerun 即移除其 rerun 计数与记录
+
+_lock = threading.Lock()
+_samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=WINDOW))
+_reruns: Dict[str, int] = defaultdict(int)          # 会话 -> rerun 次数
+_last: Dict[str, Dict[str, Any]] = {}               # 会话 -> 最近一次 rerun 记录
+_local = threading.local()                          # 当前线程正在进行的 rerun
+
+
+def session_id() -> str:
+    """当前 Streamlit 会话 ID；不在 Streamlit 脚本线程中时为 "local" """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return "local"
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else "local"
+
+
+def _record(stage: str, elapsed: float) -> None:
+    with _lock:
+        _samples[stage].append(elapsed)
+    current = getattr(_local, "current", None)
+    if current is not None:
+        stages = current["stages"]
+        stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """记录 with 块的耗时；同一 rerun 中同名阶段的耗时累加"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - start)
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """装饰器形式的 span"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def rerun(page: Optional[str]) -> Iterator[None]:
+    """包住一次脚本运行；st.stop() / st.rerun() 引发的异常同样会结束记录"""
+    session = session_id()
+    _local.current = {"stages": {}}
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - start
+        current, _local.current = _local.current, None
+        _record("rerun", total)
+        with _lock:
+            _reruns[session] += 1
+            record = {
+                "ts": time.time(),
+                "session": session,
+                "rerun": _reruns[session],
+                "page": page,
+                "total": round(total, 6),
+                "stages": {k: round(v, 6) for k, v in current["stages"].items()},
+            }
+            _last[session] = record
+            for old in [s for s, rec in _last.items() if record["ts"] - rec["ts"] > SESSION_TTL]:
+                del _last[old]
+                _reruns.pop(old, None)
+            _append(record)
+
+
+def _append(record: Dict[str, Any]) -> None:
+    """追加一行 JSONL；日志不可写时不影响页面"""
+    try:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(LOG_PATH, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+# ───── 统计 ────────────────────────────────────────────────────
+def summary() -> "pd.DataFrame":
+    """各阶段的样本数与 p50 / p95 / 最大耗时（毫秒）"""
+    import numpy as np
+    import pandas as pd
+
+    with _lock:
+        samples = {stage: np.fromiter(values, dtype=float) for stage, values in _samples.items()}
+    rows = [
+        (stage, len(values), *(np.percentile(values, [50, 95]) * 1000), values.max() * 1000)
+        for stage, values in samples.items() if len(values)
+    ]
+    frame = pd.DataFrame(rows, columns=["阶段", "样本数", "p50(ms)", "p95(ms)", "最大(ms)"])
+    return frame.sort_values("p95(ms)", ascending=False, ignore_index=True)
+
+
+def session_stats(session: Optional[str] = None) -> Dict[str, Any]:
+    """会话的 rerun 次数及最近一次 rerun 记录"""
+    session = session or session_id()
+    with _lock:
+        return {"reruns": _reruns.get(session, 0), "last": _last.get(session)}
+
+
+def reset() -> None:
+    with _lock:
+        _samples.clear()
+        _reruns.clear()
+        _last.clear()
@@ -0,0 +1,82 @@
+# interval_tree.py ──────────────────────────────────────────
+"""居中区间树（centered interval tree）
+
+闭区间 [start, end]，一次构建，支持：
+· overlap(lo, hi)：与 [lo, hi] 相交的区间；
+· stab(x)：包含 x 的区间。
+每个节点保存跨越其中心点的区间，分别按起点、终点排序，查询时用二分
+截取，复杂度 O(log n + k)。
+"""
+from typing import List, Optional
+
+import numpy as np
+
+
+class _Node:
+    __slots__ = ("center", "starts", "by_start", "ends", "by_end", "left", "right")
+
+    def __init__(self, center: float, ids: np.ndarray, start: np.ndarray, end: np.ndarray):
+        self.center = center
+        order = np.argsort(start[ids], kind="stable")
+        self.by_start = ids[order]
+        self.starts = start[self.by_start]
+        order = np.argsort(end[ids], kind="stable")
+        self.by_end = ids[order]
+        self.ends = end[self.by_end]
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+
+class IntervalTree:
+    def __init__(self, start, end):
+        self.start = np.asarray(start, dtype=float)
+        self.end = np.asarray(end, dtype=float)
+        if self.start.shape != self.end.shape:
+            raise ValueError("start 与 end 长度不一致")
+        # 起止颠倒的区间按实际范围处理
+        self.start, self.end = np.minimum(self.start, self.end), np.maximum(self.start, self.end)
+        valid = np.flatnonzero(~(np.isnan(self.start) | np.isnan(self.end)))
+        self.root = self._build(valid)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def _build(self, ids: np.ndarray) -> Optional[_Node]:
+        if len(ids) == 0:
+            return None
+        # 以端点中位数为中心，左右子树规模大致均衡
+        center = float(np.median(np.concatenate([self.start[ids], self.end[ids]])))
+        s, e = self.start[ids], self.end[ids]
+        left = ids[e < center]
+        right = ids[s > center]
+        node = _Node(center, ids[(s <= center) & (e >= center)], self.start, self.end)
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def overlap(self, lo: float, hi: float) -> np.ndarray:
+        """与 [lo, hi] 相交的区间下标（升序）"""
+        lo, hi = min(lo, hi), max(lo, hi)
+        found: List[np.ndarray] = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if hi < node.center:
+                found.append(node.by_start[:np.searchsorted(node.starts, hi, side="right")])
+                stack.append(node.left)
+            elif lo > node.center:
+                found.append(node.by_end[np.searchsorted(node.ends, lo, side="left"):])
+                stack.append(node.right)
+            else:
+                found.append(node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+        if not found:
+            return np.empty(0, dtype=int)
+        return np.sort(np.concatenate(found))
+
+    def stab(self, x: float) -> np.ndarray:
+        """包含 x 的区间下标（升序）"""
+        return self.overlap(x, x)
@@ -1,11 +1,63 @@
-import pandas as pd
-import plotly.graph_objects as go
 import streamlit as st
+import data_store
+import timeline
+import figure_cache
+import storage
+import contemporaries
+import paged_table
+import instrument
 
-# Load the Excel file
+# 实线表示的王国时期，其余为虚线
+SOLID_KINGDOMS = ['南国犹大', '统一王国']
+
+# 列名 -> 中文显示名
+LABELS = {'kingdom':          '王国', 
+          'king_rank':        '在位顺序', 
+          'king_name_cn':     '国王中文名称', 
+          'king_name_en':     '国王英文名称', 
+          'start_year':       '开始在位年份', 
+          'end_year':         '结束在位年份', 
+          'score':            '评分', 
+          'dp_score':         '大卫鲍森评分', 
+          'duration':         '在位时长', 
+          'book':             '相关书卷', 
+          'mentioned_times':  '被提到的次数', 
+          'mentioned_times_以上': '被提到的次数以上', 
+          'score_reason':     '评分原因', 
+          'main_story':       '主要事迹'}
+
+def build_figure(filtered_data, webgl=None):
+    """诸王编年史：每个王国一条 trace"""
+    styles = {
+        kingdom: dict(line=dict(dash='solid' if kingdom in SOLID_KINGDOMS else 'dash'))
+        for kingdom in filtered_data['kingdom'].unique()
+    }
+    fig = timeline.build_timeline(
+        filtered_data,
+        start='start_year', end='end_year', y='score',
+        label='king_name_cn', category='kingdom',
+        hover_fields=[('评分', 'score'),
+                      ('评价原因', 'score_reason'),
+                      ('在位时间', 'duration'),
+                      ('相关书卷', 'book'),
+                      ('被提到的次数', 'mentioned_times')],
+        styles=styles,
+        webgl=webgl
+    )
+    
+    # 更新布局
+    fig.update_layout(
+        xaxis_title="年份",
+        yaxis_title="评价",
+        xaxis=dict(range=[-1100, -550], dtick=50),
+        yaxis=dict(range=[-3, 3], dtick=1),
+        showlegend=False
+    )
+    return fig
 
 def run():
-    df = pd.read_csv('database/kings_file.csv')
+    df = data_store.load('kings')
+    db = storage.get_backend()
     
     # Streamlit 应用
     st.title("以色列王国时期诸王")
@@ -13,60 +65,29 @@ def run():
     st.subheader('1.编年史', divider='rainbow')
     
     # 创建一个多选菜单来选择王国
-    kingdom_options = df['kingdom'].unique()
+    kingdom_options = db.distinct('kings', 'kingdom')
     selected_kingdoms = st.multiselect('选择一个或多个王国时期', kingdom_options, default=kingdom_options)
     
-    # 根据选择的王国过滤数据
-    filtered_data = df[df['kingdom'].isin(selected_kingdoms)]
-    
     # 准备可视化数据
-    fig = go.Figure()
-    
-    for _, row in filtered_data.iterrows():
-        line_dash = 'solid' if row['kingdom'] in ['南国犹大', '统一王国'] else 'dash'
-        hover_text = f"{row['king_name_cn']}<br>评分: {row['score']}<br>评价原因: {row['score_reason']}<br>在位时间: {row['duration']}<br>相关书卷: {row['book']}<br>被提到的次数: {row['mentioned_times']}"
-        fig.add_trace(go.Scatter(
-            x=[row['start_year'], row['end_year']],
-            y=[row['score'], row['score']],
-            mode='lines+markers+text',
-            name=row['king_name_cn'],
-            text=[row['king_name_cn'], ''],
-            textposition="top center",
-            line=dict(dash=line_dash),
-            hovertext=hover_text,
-            hoverinfo='text+name'
-        ))
-    
-    # 更新布局
-    fig.update_layout(
-        xaxis_title="年份",
-        yaxis_title="评价",
-        xaxis=dict(range=[-1100, -550], dtick=50),
-        yaxis=dict(range=[-3, 3], dtick=1),
-        showlegend=False
+    fig = figure_cache.get_or_build(
+        'kings_timeline',
+        {'kings': data_store.version('kings')},
+        {'kingdoms': set(selected_kingdoms)},
+        # 未命中缓存时才按选择的王国查询数据
+        lambda: build_figure(db.select('kings', {'kingdom': selected_kingdoms}))
     )
     
     # 显示图表
-    st.plotly_chart(fig, use_container_width=True)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
     
     st.subheader('2.诸王志', divider='rainbow')
     
-    df = df.rename(columns={'kingdom':          '王国', 
-                            'king_rank':        '在位顺序', 
-                            'king_name_cn':     '国王中文名称', 
-                            'king_name_en':     '国王英文名称', 
-                            'start_year':       '开始在位年份', 
-                            'end_year':         '结束在位年份', 
-                            'score':            '评分', 
-                            'dp_score':         '大卫鲍森评分', 
-                            'duration':         '在位时长', 
-                            'book':             '相关书卷', 
-                            'mentioned_times':  '被提到的次数', 
-                            'score_reason':     '评分原因', 
-                            'main_story':       '主要事迹'})
-    
-    st.dataframe(
+    paged_table.paged_table(
         df,
+        key='kings_table',
+        long_text_columns=['score_reason', 'main_story'],
+        labels=LABELS,   # 列名只在当前页上替换为中文，不复制整表
         column_config={
             '评分': st.column_config.ProgressColumn(
                 '评分', 
@@ -84,10 +105,12 @@ def run():
                 max_value = 2,
                 width = 'small'
             )
-        },
-        hide_index=True,
-        use_container_width=True
+        }
     )
+    
+    st.subheader('3.同时期人物', divider='rainbow')
+    
+    contemporaries.contemporaries_panel('kings', key='kings')
 
 # 运行应用
 if __name__ == "__main__":
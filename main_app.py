@@ -1,5 +1,6 @@
 import streamlit as st
-import kings_story, prophets_story, characters_story, routes_map, areas_map
+import app_registry
+import instrument
 import toml
 
 st.set_page_config(layout="wide")
@@ -10,6 +11,7 @@ if 'logged_in' not in st.session_state:
     st.session_state['user_permissions'] = []
 
 # 读取 TOML 文件
+@instrument.timed("load_credentials")
 def load_credentials(file_path='credentials.toml'):
     """从 TOML 文件加载用户凭证和权限"""
     try:
@@ -22,7 +24,9 @@ USER_CREDENTIALS = load_credentials()
 
 def login(user, pwd):
     """验证用户登录凭证，并根据权限存储信息"""
-    if user in USER_CREDENTIALS and USER_CREDENTIALS[user]['password'] == pwd:
+    with instrument.span("login"):
+        ok = user in USER_CREDENTIALS and USER_CREDENTIALS[user]['password'] == pwd
+    if ok:
         st.session_state['logged_in'] = True
         st.session_state['user_permissions'] = USER_CREDENTIALS[user]['permissions']
         st.success("登录成功!")
@@ -38,37 +42,40 @@ def login_form():
         if submitted:
             login(username, password)
 
-# 若用户未登录，显示登录表单；否则显示应用选择器
-if not st.session_state['logged_in']:
-    st.title("请登录")
-    login_form()
-else:
-    # 定义子应用与权限的映射
-    app_permissions = {
-        '以色列王国时期诸王'  : 'kings_story', 
-        '以色列先知时期诸先知': 'prophets_story', 
-	'以色列各历史时期领袖': 'characters_story',
-        '历史路线地图合集'    : 'routes_map',
-	'地理区块标注'	    : 'areas_map'
-    }
+def main():
+    # 若用户未登录，显示登录表单；否则显示应用选择器
+    if not st.session_state['logged_in']:
+        st.title("请登录")
+        with instrument.rerun(None):
+            login_form()
+        return
 
-    # 根据用户权限展示可用的子应用
-    available_apps = [app for app, perm in app_permissions.items() if perm in st.session_state['user_permissions']]
+    # 根据用户权限展示可用的子应用（子应用及权限见 app_registry）
+    permissions = st.session_state['user_permissions']
+    available_apps = app_registry.available(permissions)
 
     # 在侧边栏添加选择器
     app_selector = st.sidebar.selectbox(
         '选择一个应用',
-        available_apps
+        available_apps,
+        format_func=lambda app: app.name
     )
 
-    # 根据选择加载不同的应用
-    if app_selector == '以色列王国时期诸王':
-        kings_story.run()
-    if app_selector == '以色列先知时期诸先知':
-        prophets_story.run()
-    if app_selector == '以色列各历史时期领袖':
-        characters_story.run()		
-    if app_selector == '历史路线地图合集':
-        routes_map.run()
-    elif app_selector == '地理区块标注':
-        areas_map.run()
+    # 性能面板仅对拥有 metrics 权限的用户显示
+    if 'metrics' in permissions:
+        import metrics_panel
+        metrics_panel.debug_panel()
+
+    # 按需导入并运行选中的应用
+    if app_selector is not None:
+        with instrument.rerun(app_selector.module):
+            try:
+                with instrument.span("import"):
+                    entry = app_registry.load_entry(app_selector)
+                entry()
+            finally:
+                # st.stop() 同样会走到这里；memory_report 依赖 pandas，不在登录页导入
+                import memory_report
+                memory_report.record_session(instrument.session_id(), st.session_state.to_dict())
+
+main()
@@ -0,0 +1,124 @@
+# memory_report.py ──────────────────────────────────────────
+"""内存占用报告
+
+· 各会话：main_app 在每次 rerun 结束时记录该会话 session_state 的大小
+  （会话超过 SESSION_TTL 秒无活动即从报告中移除）；
+· 各缓存对象：进程级缓存（数据集、派生结果、图表、底图、索引等）中每个对象的大小；
+· 进程 RSS（仅 Linux 的 /proc 可用时）。
+
+DataFrame 按 memory_usage(deep=True) 计；由 Arrow 文件内存映射而来的列也计入，
+但这部分位于操作系统页缓存中，同机的多个进程共享同一份（见 shared_cache）。
+本模块不依赖 streamlit，面板见 metrics_panel。
+"""
+import pathlib
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+SESSION_TTL = 3600
+
+_lock = threading.Lock()
+_sessions: Dict[str, Dict[str, Any]] = {}     # 会话 -> {ts, keys, bytes, largest}
+
+
+def sizeof(obj: Any) -> int:
+    """对象及其引用到的内容的近似字节数（同一对象只计一次）"""
+    seen, stack, total = set(), [obj], 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, pd.DataFrame):
+            total += int(item.memory_usage(deep=True, index=True).sum())
+        elif isinstance(item, (pd.Series, pd.Index)):
+            total += int(item.memory_usage(deep=True))
+        elif isinstance(item, np.ndarray):
+            total += item.nbytes
+        else:
+            total += sys.getsizeof(item)
+            if isinstance(item, dict):
+                stack.extend(item.keys())
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple, set, frozenset, deque)):
+                stack.extend(item)
+            elif hasattr(item, "__dict__") and not callable(item):
+                stack.append(vars(item))
+    return total
+
+
+# ───── 会话 ──────────────────────────────────────────────────
+def record_session(session: str, state: Mapping[str, Any]) -> None:
+    """记录会话 session_state 的大小，并清理长时间无活动的会话"""
+    sizes = {str(key): sizeof(value) for key, value in state.items()}
+    now = time.time()
+    with _lock:
+        _sessions[session] = {
+            "ts": now,
+            "keys": len(sizes),
+            "bytes": sum(sizes.values()),
+            "largest": max(sizes, key=sizes.get) if sizes else "",
+        }
+        for old in [s for s, rec in _sessions.items() if now - rec["ts"] > SESSION_TTL]:
+            del _sessions[old]
+
+
+def sessions() -> pd.DataFrame:
+    """各会话的 session_state 大小，按字节数降序"""
+    now = time.time()
+    with _lock:
+        rows = [(s[:8], rec["keys"], rec["bytes"], rec["largest"], round(now - rec["ts"]))
+                for s, rec in _sessions.items()]
+    frame = pd.DataFrame(rows, columns=["会话", "键数", "字节", "最大的键", "空闲(秒)"])
+    return frame.sort_values("字节", ascending=False, ignore_index=True)
+
+
+# ───── 进程级缓存 ─────────────────────────────────────────────
+def _label(key: Any) -> str:
+    if isinstance(key, tuple):
+        key = ":".join(str(part) for part in key if part not in ((), None))
+    elif isinstance(key, pathlib.Path):
+        key = key.name
+    return str(key)[:80]
+
+
+# 提供 cache_contents()（缓存名称 -> {键: 对象}）的模块；只用于报告。
+# 只统计已导入的模块，未导入的模块没有缓存内容。
+CACHE_MODULES = (
+    "data_store", "figure_cache", "geo_index", "geo_simplify", "basemap", "spatial_index",
+    "gazetteer", "search_index", "scripture", "contemporaries", "geocoding",
+)
+
+
+def cached_objects() -> pd.DataFrame:
+    """每个缓存对象的大小，按字节数降序"""
+    rows = []
+    for module in CACHE_MODULES:
+        if module not in sys.modules:
+            continue
+        try:
+            contents = sys.modules[module].cache_contents()
+        except Exception as exc:     # 某个模块的缓存不可读时不影响其余报告
+            rows.append((module, f"读取失败：{type(exc).__name__}", 0))
+            continue
+        for cache, items in contents.items():
+            for key, obj in items.items():
+                rows.append((cache, _label(key), sizeof(obj)))
+    frame = pd.DataFrame(rows, columns=["缓存", "对象", "字节"])
+    return frame.sort_values("字节", ascending=False, ignore_index=True)
+
+
+def process_rss() -> Optional[int]:
+    """当前进程的常驻内存（字节）；无 /proc 时为 None"""
+    try:
+        for line in pathlib.Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,40 @@
+# metrics_panel.py ──────────────────────────────────────────
+"""侧边栏性能面板（仅对拥有 metrics 权限的用户显示）"""
+import pandas as pd
+import streamlit as st
+
+import figure_cache
+import instrument
+import memory_report
+
+
+def debug_panel() -> None:
+    with st.sidebar.expander("性能指标", expanded=False):
+        stats = instrument.session_stats()
+        st.caption(f"本会话 rerun 次数：{stats['reruns']}")
+
+        last = stats["last"]
+        if last is not None:
+            st.markdown(f"**上一次 rerun**（{last['page'] or '登录'}）：{last['total'] * 1000:.0f} ms")
+            stages = pd.Series(last["stages"], dtype=float).mul(1000).round(1)
+            st.dataframe(stages.sort_values(ascending=False).rename("耗时(ms)"),
+                         use_container_width=True)
+
+        st.markdown("**各阶段延迟（进程内最近样本）**")
+        st.dataframe(instrument.summary().round(1), hide_index=True, use_container_width=True)
+
+        st.markdown("**图表缓存**")
+        st.json(figure_cache.stats())
+
+        st.markdown("**内存**")
+        rss = memory_report.process_rss()
+        if rss is not None:
+            st.caption(f"进程常驻内存：{rss / 2**20:.1f} MB")
+        objects = memory_report.cached_objects()
+        st.dataframe(objects.groupby("缓存", sort=False)["字节"].sum().rename("字节"),
+                     use_container_width=True)
+        st.caption("各缓存对象")
+        st.dataframe(objects, hide_index=True, use_container_width=True)
+        st.caption("各会话 session_state")
+        st.dataframe(memory_report.sessions(), hide_index=True, use_container_width=True)
+        st.caption(f"日志：{instrument.LOG_PATH}")
@@ -0,0 +1,112 @@
+# paged_table.py ────────────────────────────────────────────
+"""服务端分页表格
+
+排序、关键词过滤和分页都在服务端完成，只把当前页、选中的列发送到浏览器；
+长文本列在表格中截断显示，需要时再单独展开某一行的全文。
+"""
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import instrument
+
+PAGE_SIZES = (20, 50, 100)
+TEXT_WIDTH = 40         # 长文本列在表格中显示的字符数
+
+
+def _truncate(values: pd.Series, width: int) -> pd.Series:
+    text = values.astype(str)
+    long = text.str.len() > width
+    return text.where(~long, text.str.slice(0, width) + "…").where(values.notna(), None)
+
+
+@instrument.timed("paged_table")
+def paged_table(
+    data: pd.DataFrame,
+    key: str,
+    columns: Optional[Sequence[str]] = None,
+    long_text_columns: Sequence[str] = (),
+    labels: Optional[Dict[str, str]] = None,
+    column_config: Optional[Dict[str, Any]] = None,
+    page_sizes: Sequence[int] = PAGE_SIZES,
+) -> None:
+    """显示 data 的一页
+
+    columns 为默认显示的列（其余列可在“显示列”中添加）；
+    labels 为 列名 -> 显示名，只作用于当前页；column_config 以显示名为键。
+    data 不会被修改或复制。
+    """
+    labels = labels or {}
+    all_columns = list(data.columns)
+    default_columns = list(columns) if columns is not None else all_columns
+    label = lambda col: labels.get(col, col)
+
+    with st.expander("表格选项", expanded=False):
+        shown = st.multiselect('显示列', all_columns, default=default_columns,
+                               format_func=label, key=f"{key}_columns")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            query = st.text_input('关键词过滤', key=f"{key}_query")
+        with col2:
+            sort_col = st.selectbox('排序列', [None] + all_columns,
+                                    format_func=lambda c: '（原始顺序）' if c is None else label(c),
+                                    key=f"{key}_sort")
+        with col3:
+            descending = st.toggle('降序', key=f"{key}_desc")
+    shown = shown or default_columns
+
+    # ───── 过滤：得到行位置，不复制数据 ───────────────────────
+    positions = np.arange(len(data))
+    if query:
+        mask = np.zeros(len(data), dtype=bool)
+        for col in shown:
+            mask |= data[col].astype(str).str.contains(query, case=False, regex=False).to_numpy()
+        positions = positions[mask]
+
+    # ───── 排序 ────────────────────────────────────────────
+    if sort_col is not None and len(positions):
+        values = data[sort_col].iloc[positions]
+        order = np.argsort(values.rank(method="first", na_option="bottom",
+                                       ascending=not descending).to_numpy(), kind="stable")
+        positions = positions[order]
+    elif descending:
+        positions = positions[::-1]
+
+    # ───── 分页 ────────────────────────────────────────────
+    total = len(positions)
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox('每页行数', page_sizes, key=f"{key}_page_size")
+    pages = max(1, -(-total // page_size))
+    # 页码只经 session_state 设置（控件不再传 value），过滤后页数变少时收回到有效范围
+    page_key = f"{key}_page"
+    if page_key not in st.session_state:
+        st.session_state[page_key] = 1
+    elif st.session_state[page_key] > pages:
+        st.session_state[page_key] = pages
+    with col2:
+        page = st.number_input('页码', min_value=1, max_value=pages, step=1, key=page_key)
+    with col3:
+        st.caption(f"共 {total} 行，{pages} 页")
+
+    page_rows = positions[(page - 1) * page_size: page * page_size]
+    view = data.iloc[page_rows][shown]
+    view = view.assign(**{col: _truncate(view[col], TEXT_WIDTH)
+                          for col in long_text_columns if col in view.columns})
+    st.dataframe(view.rename(columns=labels), column_config=column_config,
+                 hide_index=True, use_container_width=True)
+
+    # ───── 长文本按需展开 ───────────────────────────────────
+    expandable = [c for c in long_text_columns if c in data.columns]
+    if expandable and len(page_rows):
+        with st.expander("查看完整文本", expanded=False):
+            first = shown[0]
+            row = st.selectbox('选择行', page_rows.tolist(),
+                               format_func=lambda r: str(data[first].iloc[r]),
+                               key=f"{key}_expand")
+            for col in expandable:
+                value = data[col].iloc[row]
+                if pd.notna(value):
+                    st.markdown(f"**{label(col)}**：{value}")
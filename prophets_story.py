@@ -1,11 +1,47 @@
-import pandas as pd
-import plotly.graph_objects as go
 import streamlit as st
+import data_store
+import timeline
+import figure_cache
+import storage
+import contemporaries
+import paged_table
+import instrument
+
+
+def build_figure(filtered_data, webgl=None):
+    """先知编年史：每个先知类型一条 trace"""
+    styles = {
+        prophet_type: dict(line=dict(dash='solid' if prophet_type == '主要' else 'dash'))
+        for prophet_type in filtered_data['先知类型'].unique()
+    }
+    fig = timeline.build_timeline(
+        filtered_data,
+        start='开始年份', end='结束年份', y='重要度评分',
+        label='先知名称', category='先知类型',
+        hover_fields=[('重要度评分', '重要度评分'),
+                      ('评分原因', '评分原因'),
+                      ('在位时间', '先知时长'),
+                      ('相关书卷', '相关书卷'),
+                      ('被提到的次数', '被提及次数')],
+        styles=styles,
+        webgl=webgl
+    )
+
+    # 更新布局
+    fig.update_layout(
+        xaxis_title="年份",
+        yaxis_title="重要度评分",
+        xaxis=dict(range=[-1500, -400], dtick=100),
+        yaxis=dict(range=[0, 11], dtick=1),
+        showlegend=False
+    )
+    return fig
 
 
 def run():
-    # Load the CSV file
-    df = pd.read_csv('database/prophets_file.csv')
+    # 先知志显示全表（进程共享的只读 DataFrame）；图表按所选类型经存储后端查询
+    df = data_store.load('prophets')
+    db = storage.get_backend()
 
     # Streamlit 应用
     st.title("以色列先知时期")
@@ -13,46 +49,28 @@ def run():
     st.subheader('1.编年史', divider='rainbow')
 
     # 创建一个多选菜单来选择先知类型
-    prophet_types = df['先知类型'].unique()
+    prophet_types = db.distinct('prophets', '先知类型')
     selected_prophet_types = st.multiselect('选择一个或多个先知类型', prophet_types, default=prophet_types)
 
-    # 根据选择的先知类型过滤数据
-    filtered_data = df[df['先知类型'].isin(selected_prophet_types)]
-
     # 准备可视化数据
-    fig = go.Figure()
-
-    for _, row in filtered_data.iterrows():
-        line_dash = 'solid' if row['先知类型'] == '主要' else 'dash'
-        hover_text = f"{row['先知名称']}<br>重要度评分: {row['重要度评分']}<br>评分原因: {row['评分原因']}<br>在位时间: {row['先知时长']}<br>相关书卷: {row['相关书卷']}<br>被提到的次数: {row['被提及次数']}"
-        fig.add_trace(go.Scatter(
-            x=[row['开始年份'], row['结束年份']],
-            y=[row['重要度评分'], row['重要度评分']],
-            mode='lines+markers+text',
-            name=row['先知名称'],
-            text=[row['先知名称'], ''],
-            textposition="top center",
-            line=dict(dash=line_dash),
-            hovertext=hover_text,
-            hoverinfo='text+name'
-        ))
-
-    # 更新布局
-    fig.update_layout(
-        xaxis_title="年份",
-        yaxis_title="重要度评分",
-        xaxis=dict(range=[-1500, -400], dtick=100),
-        yaxis=dict(range=[0, 11], dtick=1),
-        showlegend=False
+    fig = figure_cache.get_or_build(
+        'prophets_timeline',
+        {'prophets': data_store.version('prophets')},
+        {'prophet_types': set(selected_prophet_types)},
+        # 未命中缓存时才按选择的先知类型查询数据
+        lambda: build_figure(db.select('prophets', {'先知类型': selected_prophet_types}))
     )
 
     # 显示图表
-    st.plotly_chart(fig, use_container_width=True)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
 
     st.subheader('2.先知志', divider='rainbow')
 
-    st.dataframe(
+    paged_table.paged_table(
         df,
+        key='prophets_table',
+        long_text_columns=['主要故事', '评分原因'],
         column_config={
             '重要度评分': st.column_config.ProgressColumn(
                 '重要度评分',
@@ -70,11 +88,13 @@ def run():
                 max_value=10,
                 width='small'
             )
-        },
-        hide_index=True,
-        use_container_width=True
+        }
     )
 
+    st.subheader('3.同时期人物', divider='rainbow')
+
+    contemporaries.contemporaries_panel('prophets', key='prophets')
+
 # 运行应用
 if __name__ == "__main__":
     run()
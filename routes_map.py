@@ -3,28 +3,138 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
+import data_store
+import figure_cache
+import storage
+import paged_table
+import instrument
+import chronology
+import great_circle
+import basemap
+import geo_index
+import spatial_index
+from interval_tree import IntervalTree
 
-def load_data(file_path):
-    data = pd.read_csv(file_path)
-    data[['latitude', 'longitude']] = data['位置信息(经纬度)'].str.split(',', expand=True)
-    data['latitude'] = pd.to_numeric(data['latitude'].str.strip(), errors='coerce')
-    data['longitude'] = pd.to_numeric(data['longitude'].str.strip(), errors='coerce')
-    data['信仰状态打分'] = pd.to_numeric(data['信仰状态打分'], errors='coerce').astype(int)
-    return data
-
-def adjust_coordinates(data):
-    coords = data[['latitude', 'longitude']]
-    grouped = coords.groupby(['latitude', 'longitude']).size().reset_index(name='count')
-    for _, row in grouped.iterrows():
-        if row['count'] > 1:
-            indices = data[(data['latitude'] == row['latitude']) & (data['longitude'] == row['longitude'])].index
-            for i, idx in enumerate(indices):
-                angle = 2 * np.pi * i / row['count']
-                data.at[idx, 'latitude'] += 0.02 * np.cos(angle)
-                data.at[idx, 'longitude'] += 0.02 * np.sin(angle)
-    return data
-
-def plot_route(data, token):
+# 地点表默认显示的列
+TABLE_COLUMNS = ['线路名称', '序号', '地点名称', '地点名称(英文)', '所在区域', '主要人物', '主要历史事件',
+                 '停留开始日期', '停留结束日期', '停留时间(天/年)', '相关经文', '短评', '信仰状态打分']
+
+@instrument.timed("adjust_coordinates")
+def adjust_coordinates(data, radius=0.02):
+    """坐标重合的地点沿圆周均匀错开，返回新的 DataFrame（不修改输入）
+
+    组内序号 / 组大小均由 groupby 向量化得到，与逐组扫描的结果一致。
+    """
+    grouped = data.groupby(['latitude', 'longitude'], sort=False)
+    rank = grouped.cumcount().to_numpy(dtype=float)
+    count = grouped['latitude'].transform('size').to_numpy(dtype=float)
+    angle = 2 * np.pi * np.divide(rank, count, out=np.zeros_like(rank), where=count > 1)
+    shift = np.where(count > 1, radius, 0.0)
+    return data.assign(latitude=data['latitude'] + shift * np.cos(angle),
+                       longitude=data['longitude'] + shift * np.sin(angle))
+
+def build_time_index(data):
+    """全部线路地点的 [开始年, 结束年] 区间树及出现过的年份（按数据版本只构建一次）
+
+    只有一端年份已知的地点按单一年份处理。
+    """
+    start = data['开始年'].fillna(data['结束年']).to_numpy(dtype=float)
+    end = data['结束年'].fillna(data['开始年']).to_numpy(dtype=float)
+    years = np.unique(np.concatenate([start, end]))
+    return IntervalTree(start, end), years[~np.isnan(years)]
+
+def stops_in_period(lo, hi):
+    """停留时间与 [lo, hi] 重叠的地点（跨全部线路），按开始年排序"""
+    tree, _ = data_store.derived('routes', build_time_index)
+    data = data_store.load('routes')
+    return data.iloc[tree.overlap(lo, hi)].sort_values(['开始年', '线路名称', '序号'])
+
+# 标注为地点“所在区域”的底图要素。底图只有粗略的陆地轮廓和海域，没有陆上的
+# 行政区划；海岸附近的港口与小岛常落在海域多边形内，因此只用岛屿标注。
+REGION_KINDS = ('island',)
+
+def stop_regions():
+    """全部线路地点所在的岛屿（不在岛上时为空），按数据与底图版本缓存"""
+    routes = data_store.load('routes')
+    tags = data_store.derived('routes', spatial_index.tag_points,
+                              str(basemap.NEAR_EAST), geo_index.geo_version(basemap.NEAR_EAST),
+                              REGION_KINDS)
+    return routes[['线路名称', '序号']].assign(所在区域=tags)
+
+def selected_stops(selected):
+    """选中线路的地点及所在区域；重合坐标按全部线路统一错开（按数据版本只计算一次）"""
+    data = data_store.derived('routes', adjust_coordinates)
+    data = data[data['线路名称'].isin(selected)]
+    return data.merge(stop_regions(), on=['线路名称', '序号'], how='left')
+
+def route_statistics(data):
+    """全部线路的路段距离与汇总统计（一次向量化的 haversine 计算）
+
+    返回 (汇总, 路段)：汇总按线路给出地点数、总距离、平均 / 最长路段、平均信仰状态打分；
+    路段为相邻两站之间的大圆距离。坐标缺失的地点不参与距离计算。
+    """
+    stops = data.dropna(subset=['latitude', 'longitude']).sort_values(['线路名称', '序号'], kind='stable')
+    grouped = stops.groupby('线路名称', sort=False)
+    prev = grouped[['latitude', 'longitude', '地点名称', '序号']].shift()
+    legs = pd.DataFrame({
+        '线路名称': stops['线路名称'],
+        '起点序号': prev['序号'],
+        '起点': prev['地点名称'],
+        '终点序号': stops['序号'],
+        '终点': stops['地点名称'],
+        '距离(公里)': great_circle.haversine(prev['latitude'], prev['longitude'],
+                                          stops['latitude'], stops['longitude']),
+    }).dropna(subset=['起点序号'])
+    legs['起点序号'] = legs['起点序号'].astype(int)
+
+    leg_stats = legs.groupby('线路名称', sort=False)['距离(公里)'].agg(['sum', 'mean', 'max'])
+    summary = data.groupby('线路名称', sort=False).agg(
+        地点数=('序号', 'size'),
+        平均信仰状态打分=('信仰状态打分', 'mean'),
+    )
+    summary['总距离(公里)'] = leg_stats['sum']
+    summary['平均路段(公里)'] = leg_stats['mean']
+    summary['最长路段(公里)'] = leg_stats['max']
+    summary = summary.fillna({'总距离(公里)': 0.0}).round(1).reset_index()
+    return summary, legs.round({'距离(公里)': 1}).reset_index(drop=True)
+
+def build_overlay_figure(data, series):
+    """多条线路叠加：每条线路一条轨迹，图例可单独开关"""
+    palette = px.colors.qualitative.Bold + px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, name in enumerate(series):
+        route = data[data['线路名称'] == name].sort_values('序号')
+        fig.add_trace(go.Scattermapbox(
+            name=name,
+            mode="markers+lines",
+            lon=route['longitude'],
+            lat=route['latitude'],
+            text=route['地点名称'],
+            marker=dict(size=10, color=palette[i % len(palette)]),
+            line=dict(width=2, color=palette[i % len(palette)]),
+            customdata=route[['序号', '主要人物', '信仰状态打分']],
+            hovertemplate=(
+                "<b>%{text}</b><br>" +
+                f"{name}<br>" +
+                "序号: %{customdata[0]}<br>" +
+                "主要人物: %{customdata[1]}<br>" +
+                "信仰状态打分: %{customdata[2]}<extra></extra>"
+            )
+        ))
+    fig.update_layout(
+        mapbox=dict(
+            style="mapbox://styles/mapbox/streets-v11",
+            zoom=4,
+            center=dict(lat=data['latitude'].mean(), lon=data['longitude'].mean())
+        ),
+        height=600,
+        margin={"r":0,"t":0,"l":0,"b":0},
+        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
+    )
+    return fig
+
+def build_route_figure(data):
+    """单条线路的地图图表（不含访问令牌，便于缓存）"""
     colorscale = px.colors.diverging.Earth
 
     fig = go.Figure(go.Scattermapbox(
@@ -60,36 +170,206 @@ def plot_route(data, token):
     fig.update_layout(
         mapbox=dict(
             style="mapbox://styles/mapbox/streets-v11",
-            accesstoken=token,
             zoom=6,
             center=dict(lat=data['latitude'].mean(), lon=data['longitude'].mean())
         ),
         height=600,
         margin={"r":0,"t":0,"l":0,"b":0}
     )
-    
-    st.plotly_chart(fig)
+    return fig
+
+def show_basemap(fig, token):
+    """有令牌时使用 Mapbox 在线地图，否则换为离线底图"""
+    if token:
+        fig.update_layout(mapbox_accesstoken=token)
+    else:
+        basemap.apply(fig, basemap.NEAR_EAST)
+
+def plot_route(data, token, selected_series):
+    fig = figure_cache.get_or_build(
+        'routes_map',
+        {'routes': data_store.version('routes')},
+        {'线路名称': selected_series},
+        lambda: build_route_figure(data)
+    )
+    show_basemap(fig, token)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig)
+
+def plot_overlay(data, token, selected_series):
+    fig = figure_cache.get_or_build(
+        'routes_overlay',
+        {'routes': data_store.version('routes')},
+        {'线路名称': list(selected_series)},
+        lambda: build_overlay_figure(data, selected_series)
+    )
+    show_basemap(fig, token)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig)
+
+# 回放的数据量上限：整条路径的插值点数、帧数、每帧路径点数
+PLAYBACK_PATH_POINTS = 600
+PLAYBACK_MAX_FRAMES = 100
+PLAYBACK_FRAME_POINTS = 120
+
+def build_playback_figure(data):
+    """线路回放动画：沿大圆插值的路径与按序号逐站推进的帧
+
+    帧只更新“已走路径”和“当前位置”两条轨迹；站数超过 PLAYBACK_MAX_FRAMES 时
+    均匀抽取关键站，每帧路径按 PLAYBACK_FRAME_POINTS 抽稀、坐标保留 4 位小数。
+    播放完全在浏览器端进行，不触发服务端 rerun。
+    """
+    data = data.dropna(subset=['latitude', 'longitude']).sort_values('序号')
+    lat, lon = data['latitude'].to_numpy(), data['longitude'].to_numpy()
+    legs = max(1, len(data) - 1)
+    path_lat, path_lon, path_leg = great_circle.interpolate(lat, lon, PLAYBACK_PATH_POINTS // legs)
+    path_lat, path_lon = path_lat.round(4), path_lon.round(4)
+    # 第 k 站在路径中的位置
+    stop_at = np.searchsorted(path_leg, np.arange(len(data)))
+
+    frames, steps = [], []
+    seqs, names = data['序号'].to_numpy(), data['地点名称'].to_numpy()
+    for k in great_circle.decimate(len(data), PLAYBACK_MAX_FRAMES):
+        seq, name = seqs[k], names[k]
+        keep = great_circle.decimate(stop_at[k] + 1, PLAYBACK_FRAME_POINTS)
+        frames.append(go.Frame(
+            name=str(seq),
+            traces=[1, 2],
+            data=[
+                go.Scattermapbox(lat=path_lat[keep], lon=path_lon[keep]),
+                go.Scattermapbox(lat=lat[k:k + 1], lon=lon[k:k + 1], text=[name]),
+            ]
+        ))
+        steps.append(dict(
+            label=f"{seq}. {name}",
+            method='animate',
+            args=[[str(seq)], dict(mode='immediate', frame=dict(duration=0, redraw=True),
+                                   transition=dict(duration=0))]
+        ))
+
+    fig = go.Figure(
+        data=[
+            go.Scattermapbox(
+                mode='markers+text', lat=lat, lon=lon, text=data['地点名称'],
+                marker=dict(size=9, color='gray'), textposition='top right',
+                hoverinfo='text', showlegend=False
+            ),
+            go.Scattermapbox(
+                mode='lines', lat=path_lat[:1], lon=path_lon[:1],
+                line=dict(width=3, color='firebrick'), hoverinfo='skip', showlegend=False
+            ),
+            go.Scattermapbox(
+                mode='markers+text', lat=lat[:1], lon=lon[:1], text=data['地点名称'].iloc[:1],
+                marker=dict(size=18, color='firebrick'), textposition='top right',
+                textfont=dict(size=18, color='firebrick'), hoverinfo='text', showlegend=False
+            ),
+        ],
+        frames=frames
+    )
+    fig.update_layout(
+        mapbox=dict(
+            style="mapbox://styles/mapbox/streets-v11",
+            zoom=6,
+            center=dict(lat=float(np.mean(lat)), lon=float(np.mean(lon)))
+        ),
+        height=600,
+        margin={"r":0,"t":0,"l":0,"b":0},
+        updatemenus=[dict(
+            type='buttons', direction='left', x=0.01, y=0.01, xanchor='left', yanchor='bottom',
+            buttons=[
+                dict(label='▶ 播放', method='animate',
+                     args=[None, dict(frame=dict(duration=800, redraw=True),
+                                      transition=dict(duration=0), fromcurrent=True)]),
+                dict(label='⏸ 暂停', method='animate',
+                     args=[[None], dict(mode='immediate', frame=dict(duration=0, redraw=False))]),
+            ]
+        )],
+        sliders=[dict(active=0, steps=steps, x=0.12, y=0.01, len=0.85,
+                      currentvalue=dict(prefix='当前站：'))]
+    )
+    return fig
+
+def plot_playback(data, token, selected_series):
+    fig = figure_cache.get_or_build(
+        'routes_playback',
+        {'routes': data_store.version('routes')},
+        {'线路名称': selected_series},
+        lambda: build_playback_figure(data)
+    )
+    show_basemap(fig, token)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig)
 
 def run():
-    data = load_data('database/routes_file.csv')
-    data = adjust_coordinates(data)
-    series_names = data['线路名称'].unique()
+    db = storage.get_backend()
+    series_names = db.distinct('routes', '线路名称')
 
     st.title("历史路线展示")
     st.markdown("""
     这个应用展示了不同历史线路的相关信息。
-    您可以选择一个线路名称，并在地图上查看相关的历史路线。
+    您可以选择一条或多条线路，在地图上查看并比较相关的历史路线。
     """)
 
-    selected_series = st.selectbox("请选择线路名称:", series_names)
-    filtered_data = data[data['线路名称'] == selected_series]
-    
-    mapbox_token = st.text_input("请输入您的 Mapbox 访问令牌:")
+    selected = st.multiselect("请选择线路名称:", series_names, default=series_names[:1])
+    if not selected:
+        st.info("请至少选择一条线路")
+        return
+    filtered_data = selected_stops(selected)
+
+    map_mode = st.radio("地图底图", basemap.MODES, horizontal=True)
+    mapbox_token = None
+    if map_mode == basemap.MAPBOX:
+        mapbox_token = st.text_input("请输入您的 Mapbox 访问令牌:")
+
+    mode = st.radio("显示方式", ["静态路线", "动画回放"], horizontal=True)
+
+    if mode == "动画回放" and len(selected) > 1:
+        st.info("动画回放一次只能播放一条线路，已改为叠加显示")
 
-    if mapbox_token:
-        plot_route(filtered_data, mapbox_token)
-    
-    st.dataframe(filtered_data, hide_index=True)
+    if map_mode == basemap.OFFLINE or mapbox_token:
+        if len(selected) > 1:
+            plot_overlay(filtered_data, mapbox_token, selected)
+        elif mode == "动画回放":
+            plot_playback(filtered_data, mapbox_token, selected[0])
+        else:
+            plot_route(filtered_data, mapbox_token, selected[0])
+
+    # ───── 线路统计 ─────────────────────────────────────────────
+    summary, legs = data_store.derived('routes', route_statistics)
+    st.markdown("### 线路统计")
+    st.dataframe(summary[summary['线路名称'].isin(selected)], hide_index=True)
+    with st.expander("各路段距离"):
+        paged_table.paged_table(legs[legs['线路名称'].isin(selected)], key='routes_legs_table')
+
+    paged_table.paged_table(
+        filtered_data,
+        key='routes_table',
+        columns=TABLE_COLUMNS,
+        long_text_columns=['地点主要信息', '主要历史事件', '地点其他信息', '短评']
+    )
+
+    # ───── 按时间筛选全部线路 ─────────────────────────────────
+    st.markdown("### 按时间筛选全部线路")
+    _, years = data_store.derived('routes', build_time_index)
+    if len(years) == 0:
+        st.info("暂无可识别年代的地点")
+        return
+    lo, hi = st.select_slider(
+        "停留时间范围",
+        options=years.tolist(),
+        value=(years[0], years[-1]),
+        format_func=chronology.format_year
+    )
+    stops = stops_in_period(lo, hi)
+    st.caption(f"{chronology.format_year(lo)} 至 {chronology.format_year(hi)}：共 {len(stops)} 个地点"
+               f"（年代不详的地点不参与筛选）")
+    paged_table.paged_table(
+        stops,
+        key='routes_time_table',
+        columns=['线路名称', '序号', '地点名称', '停留开始日期', '停留结束日期', '停留时间(天/年)',
+                 '停留天数', '日期不确定', '主要历史事件'],
+        long_text_columns=['地点主要信息', '主要历史事件', '地点其他信息', '短评']
+    )
 
 if __name__ == "__main__":
     run()
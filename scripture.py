@@ -0,0 +1,158 @@
+# scripture.py ──────────────────────────────────────────────
+"""经文出处解析与 书卷 / 章 → 条目 索引
+
+各数据集的出处是自由文本：`撒母耳记上&撒母耳记下&历代志上`、`...诗篇等`、
+`出埃及记、利未记`、`出12:37`、`民11:35,12:16`、`徒21:15-23:35`。
+parse_references() 用向量化的字符串操作把它们规范为
+(书卷, 起始章, 起始节, 结束章, 结束节) 记录（整卷引用的章节为空），
+ScriptureIndex 在此基础上预先建立 (书卷, 章) → 条目 的倒排索引。
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import data_store
+
+# (书卷全名, 简称, 章数)；列王记沿用数据中的写法，“列王纪”作为别名
+BOOKS: List[Tuple[str, str, int]] = [
+    ("创世记", "创", 50), ("出埃及记", "出", 40), ("利未记", "利", 27), ("民数记", "民", 36),
+    ("申命记", "申", 34), ("约书亚记", "书", 24), ("士师记", "士", 21), ("路得记", "得", 4),
+    ("撒母耳记上", "撒上", 31), ("撒母耳记下", "撒下", 24), ("列王记上", "王上", 22),
+    ("列王记下", "王下", 25), ("历代志上", "代上", 29), ("历代志下", "代下", 36),
+    ("以斯拉记", "拉", 10), ("尼希米记", "尼", 13), ("以斯帖记", "斯", 10), ("约伯记", "伯", 42),
+    ("诗篇", "诗", 150), ("箴言", "箴", 31), ("传道书", "传", 12), ("雅歌", "歌", 8),
+    ("以赛亚书", "赛", 66), ("耶利米书", "耶", 52), ("耶利米哀歌", "哀", 5), ("以西结书", "结", 48),
+    ("但以理书", "但", 12), ("何西阿书", "何", 14), ("约珥书", "珥", 3), ("阿摩司书", "摩", 9),
+    ("俄巴底亚书", "俄", 1), ("约拿书", "拿", 4), ("弥迦书", "弥", 7), ("那鸿书", "鸿", 3),
+    ("哈巴谷书", "哈", 3), ("西番雅书", "番", 3), ("哈该书", "该", 2), ("撒迦利亚书", "亚", 14),
+    ("玛拉基书", "玛", 4),
+    ("马太福音", "太", 28), ("马可福音", "可", 16), ("路加福音", "路", 24), ("约翰福音", "约", 21),
+    ("使徒行传", "徒", 28), ("罗马书", "罗", 16), ("哥林多前书", "林前", 16), ("哥林多后书", "林后", 13),
+    ("加拉太书", "加", 6), ("以弗所书", "弗", 6), ("腓立比书", "腓", 4), ("歌罗西书", "西", 4),
+    ("帖撒罗尼迦前书", "帖前", 5), ("帖撒罗尼迦后书", "帖后", 3), ("提摩太前书", "提前", 6),
+    ("提摩太后书", "提后", 4), ("提多书", "多", 3), ("腓利门书", "门", 1), ("希伯来书", "来", 13),
+    ("雅各书", "雅", 5), ("彼得前书", "彼前", 5), ("彼得后书", "彼后", 3), ("约翰一书", "约一", 5),
+    ("约翰二书", "约二", 1), ("约翰三书", "约三", 1), ("犹大书", "犹", 1), ("启示录", "启", 22),
+]
+BOOK_ORDER = {name: i for i, (name, _, _) in enumerate(BOOKS)}
+CHAPTERS = {name: chapters for name, _, chapters in BOOKS}
+
+ALIASES: Dict[str, str] = {}
+for _name, _abbr, _ in BOOKS:
+    ALIASES[_name] = _name
+    ALIASES[_abbr] = _name
+ALIASES.update({"列王纪上": "列王记上", "列王纪下": "列王记下"})
+
+# 数据集 -> (显示名, 标题列, 出处列)
+SOURCES: Dict[str, Tuple[str, str, str]] = {
+    "kings":      ("诸王",     "king_name_cn", "book"),
+    "prophets":   ("先知",     "先知名称",     "相关书卷"),
+    "characters": ("领袖",     "中文名称",     "相关书卷"),
+    "routes":     ("路线地点", "地点名称",     "相关经文"),
+}
+
+_SEPARATORS = r"\s*[&、,，;；]\s*"
+_PIECE = (r"^(?P<book>[^\d:：\-–~]*?)\s*"
+          r"(?:(?P<c1>\d+)(?:[:：](?P<v1>\d+))?"
+          r"(?:\s*[-–~]\s*(?:(?P<c2>\d+)[:：])?(?P<v2>\d+))?)?$")
+
+
+def parse_references(refs: pd.Series) -> pd.DataFrame:
+    """把出处文本列解析为引用记录
+
+    返回列：src（原 Series 的索引）、book、chapter_start、verse_start、
+    chapter_end、verse_end、raw；整卷引用的章节为 <NA>。
+    无法识别书卷的片段丢弃；不带书卷的片段（如 `12:16`）沿用同一行前一片段的书卷。
+    """
+    pieces = (refs.fillna("").astype(str)
+              .str.replace("等", "", regex=False)
+              .str.split(_SEPARATORS, regex=True)
+              .explode())
+    pieces = pieces[pieces.str.strip() != ""].str.strip()
+    parts = pieces.str.extract(_PIECE)
+    parts["raw"] = pieces
+    book_text = parts["book"].fillna("").str.strip()
+    # 未知书卷标记为 "?"，使其后不带书卷的片段也一并丢弃
+    book = book_text.map(ALIASES).fillna("?").where(book_text != "")
+    parts["book"] = book.groupby(level=0).ffill()
+    parts = parts[parts["book"].isin(CHAPTERS)]
+
+    c1 = pd.to_numeric(parts["c1"], errors="coerce").astype("Int64")
+    v1 = pd.to_numeric(parts["v1"], errors="coerce").astype("Int64")
+    c2 = pd.to_numeric(parts["c2"], errors="coerce").astype("Int64")
+    v2 = pd.to_numeric(parts["v2"], errors="coerce").astype("Int64")
+    # `17-18` 无节号时表示章范围
+    chapter_range = v1.isna() & v2.notna()
+    out = pd.DataFrame({
+        "src": parts.index,
+        "book": parts["book"].to_numpy(),
+        "chapter_start": c1.array,
+        "verse_start": v1.array,
+        "chapter_end": c2.fillna(v2.where(chapter_range)).fillna(c1).array,
+        "verse_end": v2.where(~chapter_range).fillna(v1).array,
+        "raw": parts["raw"].to_numpy(),
+    })
+    return out.reset_index(drop=True)
+
+
+class ScriptureIndex:
+    """(书卷, 章) → 条目；章为 None 的键收录整卷引用"""
+
+    def __init__(self, records: pd.DataFrame):
+        self.records = records
+        self.entries: Dict[Tuple[str, Optional[int]], List[int]] = {}
+        whole = records["chapter_start"].isna()
+        for rid, book in zip(records.index[whole], records["book"][whole]):
+            self.entries.setdefault((book, None), []).append(rid)
+        spans = records[~whole]
+        for rid, book, start, end in zip(spans.index, spans["book"],
+                                         spans["chapter_start"], spans["chapter_end"]):
+            for chapter in range(int(start), int(end) + 1):
+                self.entries.setdefault((book, chapter), []).append(rid)
+
+    def books(self) -> List[str]:
+        """索引中出现过的书卷，按正典顺序"""
+        return sorted({book for book, _ in self.entries}, key=BOOK_ORDER.get)
+
+    def lookup(self, book: str, chapter: Optional[int] = None) -> pd.DataFrame:
+        """与书卷（及章）相关的全部条目；指定章时也包括整卷引用"""
+        book = ALIASES.get(book, book)
+        if chapter is None:
+            ids = [rid for (b, _), rids in self.entries.items() if b == book for rid in rids]
+        else:
+            ids = self.entries.get((book, chapter), []) + self.entries.get((book, None), [])
+        return self.records.loc[sorted(set(ids))]
+
+
+def build_index() -> ScriptureIndex:
+    frames = []
+    for dataset, (label, title_col, ref_col) in SOURCES.items():
+        frame = data_store.load(dataset)
+        refs = parse_references(frame[ref_col].reset_index(drop=True))
+        rows = refs["src"].to_numpy()
+        refs.insert(0, "dataset", dataset)
+        refs.insert(1, "category", label)
+        refs.insert(2, "title", frame[title_col].astype(str).str.strip().to_numpy()[rows])
+        frames.append(refs)
+    return ScriptureIndex(pd.concat(frames, ignore_index=True))
+
+
+_lock = threading.Lock()
+_indexes: Dict[Tuple[str, ...], ScriptureIndex] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"经文索引": dict(_indexes)}
+
+
+def get_index() -> ScriptureIndex:
+    """按各数据集版本缓存的索引"""
+    key = tuple(data_store.version(name) for name in SOURCES)
+    with _lock:
+        if key not in _indexes:
+            _indexes.clear()
+            _indexes[key] = build_index()
+        return _indexes[key]
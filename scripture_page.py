@@ -0,0 +1,55 @@
+import pandas as pd
+import streamlit as st
+import scripture
+
+
+def format_reference(book, chapter_start, verse_start, chapter_end, verse_end):
+    """规范化后的出处，如 使徒行传 21:15-23:35；整卷引用只显示书卷"""
+    if pd.isna(chapter_start):
+        return f"{book}（整卷）"
+    start = f"{chapter_start}" + (f":{verse_start}" if pd.notna(verse_start) else "")
+    if chapter_end == chapter_start and (pd.isna(verse_end) or verse_end == verse_start):
+        return f"{book} {start}"
+    if chapter_end == chapter_start:
+        return f"{book} {start}-{verse_end}"
+    end = f"{chapter_end}" + (f":{verse_end}" if pd.notna(verse_end) else "")
+    return f"{book} {start}-{end}"
+
+
+def run():
+    st.title("经文索引")
+    st.markdown("""
+    按书卷和章查找相关的君王、先知、领袖与路线地点。
+    指定章时，只标注了书卷（未标注章节）的条目也会一并列出。
+    """)
+
+    index = scripture.get_index()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        book = st.selectbox('书卷', index.books())
+    with col2:
+        chapters = ['全部'] + list(range(1, scripture.CHAPTERS[book] + 1))
+        chapter = st.selectbox('章', chapters)
+
+    results = index.lookup(book, None if chapter == '全部' else chapter)
+    st.caption(f"共 {results['title'].nunique()} 个条目，{len(results)} 处出处")
+    if results.empty:
+        return
+
+    st.dataframe(
+        pd.DataFrame({
+            '类别': results['category'],
+            '名称': results['title'],
+            '出处': [format_reference(*ref) for ref in zip(
+                results['book'], results['chapter_start'], results['verse_start'],
+                results['chapter_end'], results['verse_end'])],
+            '原始记录': results['raw'],
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+# 运行应用
+if __name__ == "__main__":
+    run()
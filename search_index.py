@@ -0,0 +1,193 @@
+# search_index.py ───────────────────────────────────────────
+"""跨数据集全文检索
+
+内存倒排索引，按各数据集版本构建一次（进程内共享）：
+· 中文按字的二元组（bigram）切分，同时收录单字以支持单字查询；
+· 英文按单词小写切分，人名 / 地名字段权重更高；
+· 排序用 BM25；支持前缀查询（`abr*`）与短语查询（`"过约旦河"`）。
+  中文词本身按短语处理：二元组求交后再核对原文是否连续出现。
+"""
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import data_store
+
+# 数据集 -> (显示名, 标题列, 英文名列, 正文列)
+SOURCES: Dict[str, Tuple[str, str, str, Sequence[str]]] = {
+    "kings": ("诸王", "king_name_cn", "king_name_en",
+              ["main_story", "score_reason", "book", "kingdom"]),
+    "prophets": ("先知", "先知名称", "先知英文名称",
+                 ["主要故事", "评分原因", "相关书卷", "先知类型"]),
+    "characters": ("领袖", "中文名称", "英文名称",
+                   ["主要故事", "重要度评分原因", "信仰状态评分原因", "相关书卷", "人物类型"]),
+    "routes": ("路线地点", "地点名称", "地点名称(英文)",
+               ["主要历史事件", "短评", "地点主要信息", "主要人物", "线路名称", "相关经文"]),
+}
+
+NAME_WEIGHT = 3         # 名称字段中的词频权重
+K1, B = 1.2, 0.75       # BM25 参数
+
+_CJK = re.compile(r"[㐀-鿿豈-﫿]+")
+_WORD = re.compile(r"[a-z0-9]+")
+_QUERY = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def _cjk_tokens(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return list(run) + [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """中文单字 + 二元组，英文小写单词"""
+    text = text.lower()
+    tokens = []
+    for run in _CJK.findall(text):
+        tokens.extend(_cjk_tokens(run))
+    tokens.extend(_WORD.findall(text))
+    return tokens
+
+
+def _query_tokens(term: str) -> List[str]:
+    """查询词只用二元组（单字词除外），避免单字带来的大量候选"""
+    term = term.lower()
+    tokens = []
+    for run in _CJK.findall(term):
+        tokens.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+    tokens.extend(_WORD.findall(term))
+    return tokens
+
+
+@dataclass
+class Hit:
+    dataset: str
+    row: int
+    title: str
+    score: float
+    snippet: str
+
+
+class SearchIndex:
+    def __init__(self):
+        self.docs: List[Tuple[str, int, str, str]] = []     # (数据集, 行号, 标题, 全文)
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.lengths: List[float] = []
+        self.vocab: List[str] = []
+
+    def add(self, dataset: str, row: int, title: str, names: str, body: str) -> None:
+        doc_id = len(self.docs)
+        self.docs.append((dataset, row, title, f"{names}\n{body}"))
+        length = 0.0
+        for weight, text in ((NAME_WEIGHT, names), (1, body)):
+            for tok in tokenize(text):
+                posting = self.postings[tok]
+                posting[doc_id] = posting.get(doc_id, 0.0) + weight
+                length += weight
+        self.lengths.append(length)
+
+    def finish(self) -> "SearchIndex":
+        self.postings = dict(self.postings)
+        self.vocab = sorted(self.postings)
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 1.0
+        return self
+
+    # ───── 查询 ────────────────────────────────────────────
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.vocab, prefix)
+        end = bisect.bisect_left(self.vocab, prefix + "￿")
+        return self.vocab[start:end]
+
+    def _bm25(self, token: str, doc_id: int, tf: float) -> float:
+        df = len(self.postings[token])
+        idf = math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+        norm = tf + K1 * (1 - B + B * self.lengths[doc_id] / self.avg_length)
+        return idf * tf * (K1 + 1) / norm
+
+    def search(self, query: str, limit: int = 50, datasets: Optional[Sequence[str]] = None) -> List[Hit]:
+        """所有查询词都需命中（AND）；返回按 BM25 排序的结果"""
+        scores: Optional[Dict[int, float]] = None
+        phrases: List[str] = []
+        for phrase, word in _QUERY.findall(query):
+            term = phrase or word
+            if phrase or _CJK.search(term):
+                phrases.append(term.lower().rstrip("*"))
+            if word.endswith("*") and _WORD.fullmatch(word[:-1].lower()):
+                groups = [self._expand_prefix(word[:-1].lower())]
+            else:
+                groups = [[tok] for tok in _query_tokens(term.rstrip("*"))]
+            for tokens in groups:
+                matched: Dict[int, float] = {}
+                for tok in tokens:
+                    for doc_id, tf in self.postings.get(tok, {}).items():
+                        matched[doc_id] = matched.get(doc_id, 0.0) + self._bm25(tok, doc_id, tf)
+                if scores is None:
+                    scores = matched
+                else:
+                    scores = {d: s + matched[d] for d, s in scores.items() if d in matched}
+                if not scores:
+                    return []
+        if not scores:
+            return []
+
+        hits = []
+        for doc_id, score in sorted(scores.items(), key=lambda kv: -kv[1]):
+            dataset, row, title, text = self.docs[doc_id]
+            if datasets is not None and dataset not in datasets:
+                continue
+            lowered = text.lower()
+            if any(p not in lowered for p in phrases):
+                continue
+            hits.append(Hit(dataset, row, title, score, _snippet(text, phrases)))
+            if len(hits) >= limit:
+                break
+        return hits
+
+
+def _snippet(text: str, phrases: Sequence[str], width: int = 40) -> str:
+    body = text.split("\n", 1)[-1]
+    pos = -1
+    for p in phrases:
+        pos = body.lower().find(p)
+        if pos >= 0:
+            break
+    if pos < 0:
+        return body[:width * 2]
+    start = max(0, pos - width)
+    return ("…" if start else "") + body[start:pos + width] + ("…" if pos + width < len(body) else "")
+
+
+def build_index() -> SearchIndex:
+    index = SearchIndex()
+    for dataset, (_, title_col, en_col, text_cols) in SOURCES.items():
+        frame = data_store.load(dataset)
+        titles = frame[title_col].astype(str).str.strip()
+        names = (titles + " " + frame[en_col].fillna("").astype(str)).tolist()
+        bodies = frame[list(text_cols)].fillna("").astype(str).agg(" ".join, axis=1).tolist()
+        for row, (title, name, body) in enumerate(zip(titles.tolist(), names, bodies)):
+            index.add(dataset, row, title, name, body)
+    return index.finish()
+
+
+_lock = threading.Lock()
+_indexes: Dict[Tuple[str, ...], SearchIndex] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"全文索引": dict(_indexes)}
+
+
+def get_index() -> SearchIndex:
+    """按各数据集版本缓存的索引，数据更新后重建"""
+    key = tuple(data_store.version(name) for name in SOURCES)
+    with _lock:
+        if key not in _indexes:
+            _indexes.clear()
+            _indexes[key] = build_index()
+        return _indexes[key]
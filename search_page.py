@@ -0,0 +1,40 @@
+import pandas as pd
+import streamlit as st
+import search_index
+
+
+def run():
+    st.title("全文检索")
+    st.markdown("""
+    在诸王、先知、领袖和路线地点中检索人物、地名与事件。
+    多个词以空格分隔（需同时命中）；英文支持前缀查询，如 `dav*`；用引号进行短语查询，如 `"过约旦河"`。
+    """)
+
+    query = st.text_input("检索词", placeholder='例如：耶利哥')
+    scope = st.multiselect(
+        '检索范围',
+        list(search_index.SOURCES),
+        default=list(search_index.SOURCES),
+        format_func=lambda name: search_index.SOURCES[name][0]
+    )
+
+    if not query.strip():
+        st.info("请输入检索词")
+        return
+
+    hits = search_index.get_index().search(query, limit=200, datasets=scope)
+    st.caption(f"共 {len(hits)} 条结果")
+    if not hits:
+        return
+
+    results = pd.DataFrame({
+        '类别': [search_index.SOURCES[h.dataset][0] for h in hits],
+        '名称': [h.title for h in hits],
+        '相关度': [round(h.score, 2) for h in hits],
+        '摘要': [h.snippet for h in hits],
+    })
+    st.dataframe(results, hide_index=True, use_container_width=True)
+
+# 运行应用
+if __name__ == "__main__":
+    run()
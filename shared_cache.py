@@ -0,0 +1,81 @@
+# shared_cache.py ───────────────────────────────────────────
+"""多进程共享的缓存层
+
+同一台机器上的多个 Streamlit 进程（负载均衡后的多个副本）共用同一份磁盘缓存：
+· 数据集解析结果写成未压缩的 Arrow 文件，文件名带源文件哈希与列定义摘要作版本戳，
+  各进程以内存映射方式读取：字符串列直接引用映射的缓冲区，无空值的数值列按列
+  拆块（split_blocks）也不复制，操作系统页缓存中只有一份。字符串列不复制依赖
+  pandas 3 默认的 Arrow 字符串类型（pandas 2 会转成 object 列，每个进程各复制一份），
+  因此 requirements.txt 要求 pandas>=3；
+· 所有写入先写临时文件再 os.replace，读者只会看到完整的旧文件或新文件；
+· file_lock() 为跨进程的排他锁（fcntl.flock），用于“只让一个进程解析”和
+  读-合并-写的缓存更新（见 geocoding.GeocodeCache.save）。
+"""
+import os
+import pathlib
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:         # 未安装 pyarrow 时不使用共享的 Arrow 文件
+    pa = feather = None
+
+try:
+    import fcntl
+except ImportError:         # 非 POSIX 平台不加锁，仍靠原子替换保证文件完整
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: pathlib.Path) -> Iterator[None]:
+    """跨进程排他锁；锁文件不存在时自动创建"""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def available() -> bool:
+    return feather is not None
+
+
+def read_arrow(path: pathlib.Path) -> Optional[pd.DataFrame]:
+    """以内存映射方式读取 Arrow 文件；文件不存在时返回 None"""
+    if feather is None or not pathlib.Path(path).exists():
+        return None
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def write_arrow(path: pathlib.Path, frame: pd.DataFrame) -> None:
+    """原子写出未压缩的 Arrow 文件（可被内存映射）"""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), tmp,
+                              compression="uncompressed")
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def prune(directory: pathlib.Path, prefix: str, keep: pathlib.Path) -> None:
+    """删除同一数据集的旧版本文件（已映射的进程不受影响）"""
+    for old in pathlib.Path(directory).glob(f"{prefix}*.arrow"):
+        if old != keep:
+            try:
+                old.unlink()
+            except OSError:
+                pass
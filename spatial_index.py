@@ -0,0 +1,183 @@
+# spatial_index.py ──────────────────────────────────────────
+"""区域空间索引（点在多边形内）
+
+把 GeoJSON 中所有多边形的边按纬度分带（slab）建索引：每条边登记到它跨越的各个
+纬度带。判断点所在区域时，只取点所在纬度带里的边，用射线法（向东的水平射线）
+统计每个要素被穿过的次数，奇数即在要素内。外环与内环（洞）的边一起计数，洞里的点
+自然判为不在要素内。
+
+同一带内的点与边组成矩阵一次计算，按要素用 reduceat 求和，没有逐点循环。
+点同时落在多个要素内时（如海域中的岛屿），取面积最小、最具体的要素。
+kinds 可只索引指定 kind 的要素（如只要岛屿，不要海域）。
+索引按文件版本只构建一次，各会话共享。
+"""
+import pathlib
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import geo_index
+
+SKIP_KINDS = {"land"}       # 覆盖整个底图的陆地多边形不作为区域
+MAX_BANDS = 4096
+CHUNK = 1 << 21             # 每次计算的 点 × 边 矩阵上限
+
+
+def _polygons(geom: Dict[str, Any]) -> List:
+    if geom["type"] == "Polygon":
+        return [geom["coordinates"]]
+    if geom["type"] == "MultiPolygon":
+        return geom["coordinates"]
+    return []
+
+
+class RegionIndex:
+    def __init__(self, geo: Dict[str, Any], skip_kinds=SKIP_KINDS, kinds: Optional[Iterable[str]] = None):
+        kinds = set(kinds) if kinds is not None else None
+        self.ids: List[str] = []        # 要素 id；无 id 时用 name
+        self.names: List[str] = []
+        areas, segments, owners = [], [], []
+        for i, feature in enumerate(geo["features"]):
+            props = feature.get("properties") or {}
+            polys = _polygons(feature["geometry"])
+            if not polys or props.get("kind") in skip_kinds:
+                continue
+            if kinds is not None and props.get("kind") not in kinds:
+                continue
+            fid = len(self.ids)
+            key = feature.get("id") if feature.get("id") is not None else props.get("name", str(i))
+            self.ids.append(str(key))
+            self.names.append(str(props.get("name", key)))
+            area = 0.0
+            for poly in polys:
+                for k, ring in enumerate(poly):
+                    ring = np.asarray(ring, dtype=float)[:, :2]
+                    if len(ring) < 3:
+                        continue
+                    if not np.array_equal(ring[0], ring[-1]):
+                        ring = np.vstack([ring, ring[:1]])
+                    x, y = ring[:, 0], ring[:, 1]
+                    ring_area = abs(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])) / 2
+                    area += ring_area if k == 0 else -ring_area
+                    segments.append(np.column_stack([ring[:-1], ring[1:]]))
+                    owners.append(np.full(len(ring) - 1, fid))
+            areas.append(area)
+        self.areas = np.asarray(areas, dtype=float)
+
+        edges = np.concatenate(segments) if segments else np.empty((0, 4))
+        owner = np.concatenate(owners) if owners else np.empty(0, dtype=int)
+        # 水平边不会被水平射线“穿过”，直接丢弃
+        keep = edges[:, 1] != edges[:, 3]
+        edges, owner = edges[keep], owner[keep]
+        self.edge_count = len(edges)
+        if not len(edges):
+            self.bounds = (0.0, 0.0, 0.0, 0.0)
+            self.bands = 1
+            self.band_start = np.zeros(2, dtype=int)
+            self.x1 = self.y1 = self.y2 = self.slope = np.empty(0)
+            self.owner = owner
+            return
+
+        xs, ys = edges[:, [0, 2]], edges[:, [1, 3]]
+        self.bounds = (xs.min(), ys.min(), xs.max(), ys.max())
+        self.bands = int(np.clip(len(edges) // 4, 16, MAX_BANDS))
+        lo = self._band(ys.min(axis=1))
+        hi = self._band(ys.max(axis=1))
+        span = hi - lo + 1
+        rows = np.repeat(np.arange(len(edges)), span)
+        band = np.repeat(lo, span) + (np.arange(len(rows)) - np.repeat(np.cumsum(span) - span, span))
+        order = np.lexsort((owner[rows], band))
+        rows, band = rows[order], band[order]
+        self.band_start = np.searchsorted(band, np.arange(self.bands + 1))
+        x1, y1, x2, y2 = edges[rows].T
+        self.x1, self.y1, self.y2 = x1, y1, y2
+        self.slope = (x2 - x1) / (y2 - y1)
+        self.owner = owner[rows]
+
+    def _band(self, y: np.ndarray) -> np.ndarray:
+        x0, y0, x1, y1 = self.bounds
+        height = (y1 - y0) / self.bands or 1.0
+        return np.clip(((y - y0) / height).astype(int), 0, self.bands - 1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def locate(self, lat, lon) -> np.ndarray:
+        """每个点所在要素的下标，不在任何要素内（或坐标缺失）时为 -1"""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        result = np.full(len(lat), -1)
+        x0, y0, x1, y1 = self.bounds
+        inside_box = (np.isfinite(lat) & np.isfinite(lon)
+                      & (lon >= x0) & (lon <= x1) & (lat >= y0) & (lat <= y1))
+        if not self.edge_count or not inside_box.any():
+            return result
+        points = np.flatnonzero(inside_box)
+        bands = self._band(lat[points])
+        order = np.argsort(bands, kind="stable")
+        points, bands = points[order], bands[order]
+        cuts = np.flatnonzero(np.diff(bands)) + 1
+        for b, group in zip(bands[np.r_[0, cuts]], np.split(points, cuts)):
+            e0, e1 = self.band_start[b], self.band_start[b + 1]
+            if e0 == e1:
+                continue
+            owner = self.owner[e0:e1]
+            starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+            feats = owner[starts]
+            area = self.areas[feats]
+            step = max(1, CHUNK // (e1 - e0))
+            for c in range(0, len(group), step):
+                pts = group[c:c + step]
+                py = lat[pts][:, None]
+                px = lon[pts][:, None]
+                y1e, y2e = self.y1[e0:e1], self.y2[e0:e1]
+                crosses = ((y1e > py) != (y2e > py)) & (px < self.x1[e0:e1] + (py - y1e) * self.slope[e0:e1])
+                odd = np.add.reduceat(crosses, starts, axis=1) % 2 == 1
+                best = np.where(odd, area, np.inf).argmin(axis=1)
+                hit = odd[np.arange(len(pts)), best]
+                result[pts[hit]] = feats[best[hit]]
+        return result
+
+    def regions(self, lat, lon) -> np.ndarray:
+        """每个点所在要素的 id（对象数组），不在任何要素内时为 None"""
+        idx = self.locate(lat, lon)
+        ids = np.asarray(self.ids + [None], dtype=object)
+        return ids[idx]
+
+
+# ───── 进程级缓存 ─────────────────────────────────────────────
+_lock = threading.Lock()
+_indexes: Dict[Tuple[pathlib.Path, str, Optional[FrozenSet[str]]], RegionIndex] = {}
+
+
+def cache_contents() -> Dict[str, Dict[Any, Any]]:
+    """缓存名称 -> {键: 对象} 的快照，供 memory_report 统计"""
+    with _lock:
+        return {"区域索引": dict(_indexes)}
+
+
+def get(path: pathlib.Path, kinds: Optional[Iterable[str]] = None) -> RegionIndex:
+    """按文件版本缓存的区域索引；kinds 为 None 时索引全部区域要素"""
+    path = pathlib.Path(path).resolve()
+    version = geo_index.geo_version(path)
+    kinds = frozenset(kinds) if kinds is not None else None
+    key = (path, version, kinds)
+    with _lock:
+        if key not in _indexes:
+            for old in [k for k in _indexes if k[0] == path and k[1] != version]:
+                del _indexes[old]
+            _indexes[key] = RegionIndex(geo_index.load_geo(path), kinds=kinds)
+        return _indexes[key]
+
+
+def tag_points(frame: pd.DataFrame, path: str, version: Optional[str] = None,
+               kinds: Optional[Tuple[str, ...]] = None) -> pd.Series:
+    """frame 的 latitude / longitude 所在区域 id（与 frame 索引对齐）
+
+    供 data_store.derived 使用：version 传入 GeoJSON 的版本，只作缓存键，
+    数据或边界文件任一更新都会重新计算。
+    """
+    index = get(pathlib.Path(path), kinds)
+    return pd.Series(index.regions(frame["latitude"], frame["longitude"]), index=frame.index)
@@ -0,0 +1,231 @@
+# storage.py ────────────────────────────────────────────────
+"""可插拔存储层
+
+database/ 下的 CSV / XLSX 仍是数据源：各数据集经 data_store 解析后导入
+带索引的数据库表，子应用通过 select() / distinct() 把过滤条件下推到查询，
+不再整表扫描。数据源哈希变化时自动重新导入。
+
+后端由环境变量选择：
+    BIBLE_STUDY_STORAGE = sqlite（默认）| postgres
+    BIBLE_STUDY_SQLITE  = SQLite 文件路径（默认 database/bible_study.sqlite）
+    BIBLE_STUDY_PG_DSN  = Postgres 连接串（postgres 后端必填）
+"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import instrument
+
+# 各表的索引列
+INDEXES: Dict[str, List[str]] = {
+    "kings":      ["kingdom"],
+    "prophets":   ["先知类型"],
+    "characters": ["人物类型"],
+    "routes":     ["线路名称"],
+    "areas":      ["地理区域组"],
+}
+
+ROW_COL = "_row"        # 保留原始行序
+META_TABLE = "_meta"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _python_value(value: Any) -> Any:
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class Backend(ABC):
+    """后端基类：子类提供连接与 SQL 方言细节"""
+
+    placeholder = "?"
+    types = {"i": "INTEGER", "f": "REAL", "b": "INTEGER"}
+    text_type = "TEXT"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._synced: Dict[str, str] = {}               # 表 -> 已导入的数据版本
+        self._distinct: Dict[tuple, List[Any]] = {}
+        self._dtypes: Dict[str, Dict[str, Any]] = {}      # 表 -> 数值 / 布尔列类型（查询结果需还原）
+
+    @abstractmethod
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """上下文管理器，产出 DB-API 连接"""
+
+    def _lock_for_import(self, cur) -> None:
+        """导入前加写锁，避免多个进程重复导入"""
+
+    # ───── 导入 ────────────────────────────────────────────
+    def _stored_version(self, cur, table: str) -> Optional[str]:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} "
+                    f"(name {self.text_type} PRIMARY KEY, version {self.text_type})")
+        cur.execute(f"SELECT version FROM {META_TABLE} WHERE name = {self.placeholder}", (table,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def _import(self, cur, table: str, frame: pd.DataFrame, version: str) -> None:
+        cols = [ROW_COL] + list(frame.columns)
+        col_types = ["INTEGER"] + [self.types.get(frame[c].dtype.kind, self.text_type)
+                                   for c in frame.columns]
+        cur.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+        cur.execute(f"CREATE TABLE {_quote(table)} ("
+                    + ", ".join(f"{_quote(c)} {t}" for c, t in zip(cols, col_types)) + ")")
+        rows = [
+            tuple(_python_value(v) for v in (i,) + tuple(values))
+            for i, values in enumerate(frame.itertuples(index=False, name=None))
+        ]
+        marks = ", ".join([self.placeholder] * len(cols))
+        cur.executemany(f"INSERT INTO {_quote(table)} VALUES ({marks})", rows)
+        for col in INDEXES.get(table, []):
+            cur.execute(f"CREATE INDEX {_quote(f'ix_{table}_{col}')} "
+                        f"ON {_quote(table)} ({_quote(col)})")
+        cur.execute(f"DELETE FROM {META_TABLE} WHERE name = {self.placeholder}", (table,))
+        cur.execute(f"INSERT INTO {META_TABLE} (name, version) VALUES "
+                    f"({self.placeholder}, {self.placeholder})", (table, version))
+
+    def sync(self, table: str) -> str:
+        """确保表内容与数据源一致，返回当前数据版本"""
+        version = data_store.version(table)
+        if self._synced.get(table) == version:
+            return version
+        with self._lock:
+            if self._synced.get(table) != version:
+                with self.connection() as conn:
+                    cur = conn.cursor()
+                    try:
+                        self._lock_for_import(cur)
+                        # 列定义（data_store.SCHEMAS）变化时同样需要重新导入
+                        stored = f"{version}:{data_store.schema_fingerprint(table)}"
+                        if self._stored_version(cur, table) != stored:
+                            self._import(cur, table, data_store.load(table), stored)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                frame = data_store.load(table)
+                self._dtypes[table] = {c: frame[c].dtype for c in frame.columns
+                                       if frame[c].dtype.kind in "fib"}
+                self._synced[table] = version
+        return version
+
+    # ───── 查询 ────────────────────────────────────────────
+    @instrument.timed("storage.select")
+    def select(self, table: str, filters: Optional[Dict[str, Any]] = None,
+               columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """按列过滤查询；过滤值为列表时表示 IN (...)"""
+        self.sync(table)
+        where, params = [], []
+        for col, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+                values = [_python_value(v) for v in value]
+                if not values:
+                    where.append("1 = 0")
+                    continue
+                where.append(f"{_quote(col)} IN ({', '.join([self.placeholder] * len(values))})")
+                params.extend(values)
+            else:
+                where.append(f"{_quote(col)} = {self.placeholder}")
+                params.append(_python_value(value))
+        cols = ", ".join(_quote(c) for c in columns) if columns else "*"
+        sql = f"SELECT {cols} FROM {_quote(table)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {_quote(ROW_COL)}"
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            names = [d[0] for d in cur.description]
+            frame = pd.DataFrame.from_records(cur.fetchall(), columns=names)
+        dtypes = {c: t for c, t in self._dtypes.get(table, {}).items() if c in frame.columns}
+        if dtypes:
+            frame = frame.astype(dtypes)
+        return frame.drop(columns=[ROW_COL], errors="ignore")
+
+    def distinct(self, table: str, column: str) -> List[Any]:
+        """列的去重取值，按首次出现顺序（与 Series.unique() 一致）"""
+        version = self.sync(table)
+        key = (table, column, version)
+        if key not in self._distinct:
+            sql = (f"SELECT {_quote(column)} FROM {_quote(table)} "
+                   f"GROUP BY {_quote(column)} ORDER BY MIN({_quote(ROW_COL)})")
+            with self.connection() as conn:
+                cur = conn.cursor()
+                cur.execute(sql)
+                self._distinct[key] = [row[0] for row in cur.fetchall()]
+        return self._distinct[key]
+
+
+class SQLiteBackend(Backend):
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or str(data_store.DB / "bible_study.sqlite")
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        # 每个线程（Streamlit 会话）一个连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        yield conn
+
+    def _lock_for_import(self, cur) -> None:
+        cur.execute("BEGIN IMMEDIATE")
+
+
+class PostgresBackend(Backend):
+    placeholder = "%s"
+    types = {"i": "BIGINT", "f": "DOUBLE PRECISION", "b": "BOOLEAN"}
+
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 8):
+        super().__init__()
+        from psycopg2.pool import ThreadedConnectionPool
+        self.pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.pool.getconn()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if not conn.closed:
+                conn.rollback()     # 结束只读查询开启的事务
+            self.pool.putconn(conn)
+
+    def _lock_for_import(self, cur) -> None:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('bible_study_import'))")
+
+
+_backend: Optional[Backend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> Backend:
+    """按环境变量创建的进程级后端单例"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            kind = os.environ.get("BIBLE_STUDY_STORAGE", "sqlite").lower()
+            if kind == "postgres":
+                _backend = PostgresBackend(os.environ["BIBLE_STUDY_PG_DSN"])
+            else:
+                _backend = SQLiteBackend(os.environ.get("BIBLE_STUDY_SQLITE"))
+        return _backend
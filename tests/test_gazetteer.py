@@ -0,0 +1,48 @@
+"""gazetteer：带逗号限定词的查询只在地区一致时命中"""
+import sys
+import pathlib
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import gazetteer  # noqa: E402
+import geocoding  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def gaz():
+    return gazetteer.get()
+
+
+@pytest.mark.parametrize("query, lat, lon", [
+    ("Boston, MA", 42.3601, -71.0589),
+    ("Philadelphia, PA", 39.9526, -75.1652),
+    ("Philadelpia, PA", 39.9526, -75.1652),          # 拼写错误仍可模糊匹配
+    ("Salem, Massachusetts, USA", 42.5195, -70.8967),
+    ("耶路撒冷", None, None),
+])
+def test_qualified_match(gaz, query, lat, lon):
+    match = gaz.lookup(query)
+    assert match is not None
+    if lat is not None:
+        assert match.coord == pytest.approx({"lat": lat, "lon": lon})
+
+
+@pytest.mark.parametrize("query", [
+    "Athens, GA", "Antioch, CA", "Salem, OR", "Plymouth, England", "Boston, Lincolnshire", "Boston, GA",
+])
+def test_qualifier_mismatch_is_a_miss(gaz, query):
+    assert gaz.lookup(query) is None
+
+
+def test_unqualified_name_still_matches(gaz):
+    assert gaz.lookup("Athens") is not None
+
+
+def test_geocoder_falls_through_on_mismatch(gaz, tmp_path):
+    cache = geocoding.GeocodeCache(tmp_path / "cache.json")
+    geocoder = geocoding.Geocoder(None, cache, gazetteer=gaz)
+    coords, errors = geocoder.resolve({"ATH": "Athens, GA", "BOS": "Boston, MA"})
+    assert "ATH" in errors and "ATH" not in coords
+    assert coords["BOS"]["lat"] == pytest.approx(42.3601)
@@ -0,0 +1,84 @@
+# timeline.py ───────────────────────────────────────────────
+"""编年史时间线构建
+
+每个类别只生成一条 trace：各人物的 [开始, 结束] 线段以空值分隔拼接在同一
+条折线里，悬停信息放在 customdata 中、由共享的 hovertemplate 渲染，
+不再逐行拼接悬停字符串。完整的悬停数据只放在线段起点，终点与分隔点不悬停，
+长文本（评分原因等）每人只下发一次。条目很多时可切换为 WebGL（Scattergl）渲染。
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import instrument
+
+# 条目数超过该值时默认使用 WebGL
+WEBGL_THRESHOLD = 1000
+
+
+def _segments(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """[s0, e0, nan, s1, e1, nan, ...]：nan 使 plotly 在线段之间断开"""
+    out = np.full(len(start) * 3, np.nan)
+    out[0::3] = start
+    out[1::3] = end
+    return out
+
+
+def _hovertemplate(hover_fields: Sequence[Tuple[str, str]]) -> str:
+    lines = ["<b>%{customdata[0]}</b>"]
+    lines += [f"{title}: %{{customdata[{i}]}}" for i, (title, _) in enumerate(hover_fields, start=1)]
+    return "<br>".join(lines)
+
+
+@instrument.timed("timeline")
+def build_timeline(
+    data: pd.DataFrame,
+    start: str,
+    end: str,
+    y: str,
+    label: str,
+    category: str,
+    hover_fields: Sequence[Tuple[str, str]],
+    styles: Optional[Dict[Any, Dict[str, Any]]] = None,
+    webgl: Optional[bool] = None,
+) -> go.Figure:
+    """按 category 分组构建时间线图
+
+    hover_fields 为 (显示名, 列名) 列表；styles 为 类别 -> trace 样式（line / marker 等）；
+    webgl 为 None 时按 WEBGL_THRESHOLD 自动选择。
+    """
+    styles = styles or {}
+    if webgl is None:
+        webgl = len(data) > WEBGL_THRESHOLD
+    trace_cls = go.Scattergl if webgl else go.Scatter
+    hovertemplate = _hovertemplate(hover_fields)
+    hover_cols: List[str] = [label] + [col for _, col in hover_fields]
+
+    fig = go.Figure()
+    for cat, part in data.groupby(category, sort=False):
+        n = len(part)
+        text = np.full(n * 3, "", dtype=object)
+        text[0::3] = part[label].to_numpy(dtype=object)
+        # 悬停数据只放在起点；终点与分隔点为空，并跳过悬停
+        customdata = np.full(n * 3, None, dtype=object)
+        customdata[0::3] = part[hover_cols].to_numpy(dtype=object).tolist()
+        hoverinfo = np.full(n * 3, "skip", dtype=object)
+        hoverinfo[0::3] = "all"
+        y_values = part[y].to_numpy(dtype=float)
+
+        fig.add_trace(trace_cls(
+            x=_segments(part[start].to_numpy(dtype=float), part[end].to_numpy(dtype=float)),
+            y=_segments(y_values, y_values),
+            mode='lines+markers+text',
+            name=str(cat),
+            text=text,
+            textposition="top center",
+            customdata=customdata,
+            hovertemplate=hovertemplate,
+            hoverinfo=hoverinfo,
+            connectgaps=False,
+            **styles.get(cat, {})
+        ))
+    return fig